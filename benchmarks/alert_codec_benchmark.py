@@ -0,0 +1,54 @@
+import argparse
+import time
+import sys
+import os
+
+# Aggiungi la root del progetto al path per poter importare i moduli
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from hmi.alert_codec import encode_alerts, decode_alerts, FORMAT_JSON, FORMAT_BINARY
+
+
+def make_objects(count):
+    """Alerts like the decision makers produce, one in N with an unknown TTC"""
+    return [
+        {
+            "zone": config.RCTA_ZONES[i % len(config.RCTA_ZONES)],
+            "alert_level": "danger" if i % 2 else "warning",
+            "class": config.ALERT_CLASSES[i % len(config.ALERT_CLASSES)],
+            "distance": 3.0 + 0.37 * i,
+            "ttc": float('inf') if i % 3 == 0 else 1.5 + 0.11 * i
+        }
+        for i in range(count)
+    ]
+
+
+def time_per_call(fn, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode/decode cost and payload size: JSON vs binary alerts")
+    parser.add_argument('--objects', type=int, nargs='+', default=[0, 1, 3, 12])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'objects':>8} {'format':>8} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for count in args.objects:
+        objects = make_objects(count)
+        for fmt in (FORMAT_JSON, FORMAT_BINARY):
+            payload = encode_alerts(objects, time.time(), fmt)
+            encode_time = time_per_call(lambda: encode_alerts(objects, 0.0, fmt), args.iterations)
+            decode_time = time_per_call(lambda: decode_alerts(payload), args.iterations)
+            print(f"{count:>8} {fmt:>8} {len(payload):>7} {encode_time * 1e6:>10.2f} {decode_time * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
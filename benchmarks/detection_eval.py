@@ -0,0 +1,94 @@
+"""
+Helpers shared by the detector benchmarks: loading of recorded frames and
+AP@0.5 per class against reference detections.
+"""
+import os
+import glob
+import numpy as np
+import cv2
+import config
+
+# Cartelle di registrazione: una per zona del registro (RECORD_FRAMES_DIR/<zone>)
+ZONE_FOLDERS = tuple(config.RCTA_ZONES)
+IMAGE_EXTENSIONS = ("*.png", "*.jpg")
+
+
+def load_frames(frames_dir, limit=None):
+    """Loads BGR frames from <frames_dir>/<zone>/*.png (or directly from frames_dir)"""
+    paths = []
+    for zone in ZONE_FOLDERS:
+        for ext in IMAGE_EXTENSIONS:
+            paths.extend(sorted(glob.glob(os.path.join(frames_dir, zone, ext))))
+    if not paths:
+        for ext in IMAGE_EXTENSIONS:
+            paths.extend(sorted(glob.glob(os.path.join(frames_dir, ext))))
+
+    if limit:
+        paths = paths[:limit]
+
+    frames = []
+    for path in paths:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            frames.append(image)
+    return frames
+
+
+def box_iou(box, boxes):
+    inter_w = np.maximum(0.0, np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]))
+    inter_h = np.maximum(0.0, np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]))
+    inter = inter_w * inter_h
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def average_precision_per_class(predictions, references, class_ids, iou_threshold=0.5):
+    """
+    predictions, references: one (N, 6) array [x1, y1, x2, y2, conf, cls] per frame.
+    Returns {class_id: AP} computed with all-point interpolation.
+    """
+    results = {}
+    for class_id in class_ids:
+        scores = []
+        matches = []
+        total_refs = 0
+
+        for pred, ref in zip(predictions, references):
+            pred = pred[pred[:, 5] == class_id]
+            ref = ref[ref[:, 5] == class_id]
+            total_refs += len(ref)
+            used = np.zeros(len(ref), dtype=bool)
+
+            for det in pred[np.argsort(-pred[:, 4])]:
+                scores.append(det[4])
+                if len(ref) == 0:
+                    matches.append(False)
+                    continue
+                iou = box_iou(det, ref)
+                iou[used] = 0.0
+                best = int(iou.argmax())
+                if iou[best] >= iou_threshold:
+                    used[best] = True
+                    matches.append(True)
+                else:
+                    matches.append(False)
+
+        if total_refs == 0:
+            results[class_id] = float('nan')
+            continue
+
+        order = np.argsort(-np.array(scores))
+        tp = np.cumsum(np.array(matches, dtype=float)[order])
+        fp = np.cumsum(1.0 - np.array(matches, dtype=float)[order])
+        recall = tp / total_refs
+        precision = tp / np.maximum(tp + fp, 1e-9)
+
+        # Area sotto la curva precision/recall con envelope monotono
+        recall = np.concatenate([[0.0], recall, [1.0]])
+        precision = np.concatenate([[1.0], precision, [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        steps = np.where(recall[1:] != recall[:-1])[0]
+        results[class_id] = float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+    return results
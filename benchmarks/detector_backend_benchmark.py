@@ -0,0 +1,91 @@
+import argparse
+import time
+import sys
+import os
+import numpy as np
+
+# Aggiungi la root del progetto al path per poter importare i moduli
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from rcta_system.object_detector import ObjectDetector
+from detection_eval import load_frames, average_precision_per_class
+
+REFERENCE_BACKEND = 'ultralytics'
+
+
+def run_backend(detector, frames, batch_size, repeat):
+    # Warm-up
+    detector.predict(frames[:batch_size])
+
+    latencies = []
+    predictions = []
+    for r in range(repeat):
+        for start in range(0, len(frames), batch_size):
+            batch = frames[start:start + batch_size]
+            t0 = time.perf_counter()
+            output = detector.predict(batch)
+            latencies.append((time.perf_counter() - t0) / len(batch))
+            if r == 0:
+                predictions.extend(output)
+    return np.array(latencies), predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and mAP parity of the detector backends")
+    parser.add_argument('--frames', default='recordings', help="folder with rear/left/right frames")
+    parser.add_argument('--backends', nargs='+', default=list(config.DETECTOR_MODEL_PATHS))
+    parser.add_argument('--batch', type=int, default=3, help="images per forward (3 = one per zone)")
+    parser.add_argument('--limit', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.limit)
+    has_references = bool(frames)
+    if not frames:
+        print(f"No frames in '{args.frames}': latency only, on blank frames")
+        frames = [np.zeros((config.CAMERA_IMAGE_HEIGHT, config.CAMERA_IMAGE_WIDTH, 3), np.uint8)] * 30
+
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends if b != REFERENCE_BACKEND]
+    reference = None
+    rows = []
+
+    for backend in backends:
+        try:
+            detector = ObjectDetector(backend=backend)
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        if detector.backend is None:
+            print(f"Skipping {backend}: model not available")
+            continue
+
+        latencies, predictions = run_backend(detector, frames, args.batch, args.repeat)
+        if reference is None:
+            reference = predictions
+            class_ids = detector.target_class_indices
+            class_names = detector.class_names
+
+        ap = {}
+        if has_references:
+            ap = average_precision_per_class(predictions, reference, class_ids)
+        rows.append((backend, latencies, ap))
+
+    print("")
+    print(f"{'backend':>12} {'mean ms':>8} {'p95 ms':>8} {'mAP@0.5 vs ' + REFERENCE_BACKEND:>24}")
+    for backend, latencies, ap in rows:
+        valid = [v for v in ap.values() if not np.isnan(v)]
+        map_str = f"{np.mean(valid):.3f}" if valid else "n/a"
+        print(f"{backend:>12} {latencies.mean() * 1e3:>8.2f} {np.percentile(latencies, 95) * 1e3:>8.2f} {map_str:>24}")
+        if valid:
+            per_class = ", ".join(
+                f"{class_names[c]}={v:.3f}" for c, v in ap.items() if not np.isnan(v)
+            )
+            print(f"{'':>12} {per_class}")
+
+
+if __name__ == '__main__':
+    main()
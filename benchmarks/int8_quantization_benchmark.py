@@ -0,0 +1,87 @@
+import argparse
+import time
+import sys
+import os
+import numpy as np
+
+# Aggiungi la root del progetto al path per poter importare i moduli
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from rcta_system.object_detector import ObjectDetector
+from rcta_system.quantization import quantize_detector
+from detection_eval import load_frames, average_precision_per_class
+
+TARGET_FPS = 40  # docs/sections/2_Requirements.md
+ZONES_PER_TICK = 3
+
+
+def measure(detector, frames):
+    detector.predict(frames[:ZONES_PER_TICK])  # warm-up
+    tick_latencies = []
+    predictions = []
+    for start in range(0, len(frames) - ZONES_PER_TICK + 1, ZONES_PER_TICK):
+        batch = frames[start:start + ZONES_PER_TICK]
+        t0 = time.perf_counter()
+        predictions.extend(detector.predict(batch))
+        tick_latencies.append(time.perf_counter() - t0)
+    return np.array(tick_latencies), predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 detector: calibration, latency and accuracy deltas")
+    parser.add_argument('--frames', default=config.QUANTIZATION_FRAMES_DIR)
+    parser.add_argument('--eval-limit', type=int, default=300)
+    parser.add_argument('--requantize', action='store_true', help="rebuild the INT8 model")
+    args = parser.parse_args()
+
+    int8_path = config.DETECTOR_MODEL_PATHS['onnxruntime-int8']
+    if args.requantize or not os.path.exists(int8_path):
+        quantize_detector(frames_dir=args.frames)
+
+    frames = load_frames(args.frames, args.eval_limit)
+    if len(frames) < ZONES_PER_TICK:
+        print(f"Not enough frames in '{args.frames}'")
+        return
+
+    reference = ObjectDetector(backend='ultralytics')
+    _, reference_predictions = measure(reference, frames)
+    class_ids = reference.target_class_indices
+    class_names = reference.class_names
+
+    results = {}
+    for backend in ('onnxruntime', 'onnxruntime-int8'):
+        detector = ObjectDetector(backend=backend)
+        latencies, predictions = measure(detector, frames)
+        ap = average_precision_per_class(predictions, reference_predictions, class_ids)
+        results[backend] = (latencies, ap)
+
+    budget_ms = 1000.0 / TARGET_FPS
+    print("")
+    print(f"Per-tick latency ({ZONES_PER_TICK} zones), budget {budget_ms:.1f} ms for {TARGET_FPS} FPS")
+    for backend, (latencies, _) in results.items():
+        mean_ms = latencies.mean() * 1e3
+        verdict = "OK" if mean_ms <= budget_ms else "over budget"
+        print(f"  {backend:>18}: mean {mean_ms:.2f} ms, p95 {np.percentile(latencies, 95) * 1e3:.2f} ms [{verdict}]")
+
+    fp32_latency = results['onnxruntime'][0].mean()
+    int8_latency = results['onnxruntime-int8'][0].mean()
+    print(f"  INT8 speed-up: {fp32_latency / int8_latency:.2f}x")
+
+    print("")
+    print("AP@0.5 against models/yolov8n.pt")
+    print(f"  {'class':>8} {'fp32':>7} {'int8':>7} {'delta':>7}")
+    for class_id in class_ids:
+        fp32_ap = results['onnxruntime'][1][class_id]
+        int8_ap = results['onnxruntime-int8'][1][class_id]
+        if np.isnan(fp32_ap):
+            print(f"  {class_names[class_id]:>8} {'n/a':>7} {'n/a':>7} {'n/a':>7}")
+            continue
+        print(f"  {class_names[class_id]:>8} {fp32_ap:>7.3f} {int8_ap:>7.3f} {int8_ap - fp32_ap:>+7.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import time
+import sys
+import os
+import numpy as np
+
+# Aggiungi la root del progetto al path per poter importare i moduli
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from rcta_system.depth_roi import _roi_distances, ROI_METHODS
+
+IMAGE_SIZE = 416
+PERCENTILE = 10.0
+REPEAT = 200
+
+# Box registrati nei run CAR (docs/result.txt), dal piu' lontano al piu' vicino
+CAR_BOXES = [
+    ([26, 192, 97, 233], 12.3),
+    ([56, 176, 237, 276], 4.8),
+    ([75, 159, 382, 327], 2.9),
+    ([206, 23, 415, 407], 1.2),
+]
+
+
+def encode_depth(depth_meters):
+    """Inverse of the CARLA depth decoding: meters -> BGRA uint8"""
+    code = np.round(depth_meters / 1000.0 * (256.0 ** 3 - 1)).astype(np.int64)
+    bgra = np.zeros(depth_meters.shape + (4,), dtype=np.uint8)
+    bgra[:, :, 2] = code & 0xFF
+    bgra[:, :, 1] = (code >> 8) & 0xFF
+    bgra[:, :, 0] = (code >> 16) & 0xFF
+    bgra[:, :, 3] = 255
+    return bgra
+
+
+def make_scene(bbox, obj_dist, rng):
+    # Sfondo: piano stradale da 60 m (orizzonte) a 3 m (bordo inferiore)
+    rows = np.linspace(60.0, 3.0, IMAGE_SIZE)[:, None]
+    depth = np.repeat(rows, IMAGE_SIZE, axis=1)
+    x1, y1, x2, y2 = bbox
+
+    # Oggetto: superficie inclinata con rumore, ~80% del box
+    obj = obj_dist + rng.uniform(0.0, 1.5, (y2 - y1, x2 - x1)) + rng.normal(0.0, 0.02, (y2 - y1, x2 - x1))
+    mask = rng.random((y2 - y1, x2 - x1)) < 0.8
+    roi = depth[y1:y2, x1:x2]
+    roi[mask] = obj[mask]
+    return encode_depth(depth)
+
+
+def time_kernel(depth_bgra, boxes, method, max_samples):
+    _roi_distances(depth_bgra, boxes, PERCENTILE, method, max_samples)  # JIT warm-up
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = _roi_distances(depth_bgra, boxes, PERCENTILE, method, max_samples)
+    return (time.perf_counter() - start) / REPEAT, result[0]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    configs = [
+        ('exact', 0),
+        ('select', 0),
+        ('histogram', 0),
+        ('select', 4096),
+        ('histogram', 4096),
+    ]
+
+    print(f"{'box px':>8} {'method':>10} {'samples':>8} {'time us':>9} {'dist m':>9} {'err mm':>8}")
+    max_error = {c: 0.0 for c in configs}
+
+    for bbox, obj_dist in CAR_BOXES:
+        depth_bgra = make_scene(bbox, obj_dist, rng)
+        boxes = np.array([bbox], dtype=np.int64)
+        area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        reference = None
+
+        for method_name, max_samples in configs:
+            elapsed, dist = time_kernel(depth_bgra, boxes, ROI_METHODS[method_name], max_samples)
+            if reference is None:
+                reference = dist
+            error_mm = abs(dist - reference) * 1000.0
+            max_error[(method_name, max_samples)] = max(max_error[(method_name, max_samples)], error_mm)
+            print(f"{area:>8} {method_name:>10} {max_samples or 'all':>8} {elapsed * 1e6:>9.1f} {dist:>9.4f} {error_mm:>8.2f}")
+        print("")
+
+    print("Max error against np.percentile:")
+    for (method_name, max_samples), error_mm in max_error.items():
+        print(f"  {method_name:>10} samples={max_samples or 'all'}: {error_mm:.2f} mm")
+
+
+if __name__ == '__main__':
+    main()
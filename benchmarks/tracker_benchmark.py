@@ -0,0 +1,146 @@
+import argparse
+import time
+import sys
+import os
+import numpy as np
+
+# Aggiungi la root del progetto al path per poter importare i moduli
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from rcta_system.iou_tracker import IouDepthTracker
+
+IMAGE_SIZE = 416
+FRAME_DT = 0.3  # sensor_tick delle camere RCTA
+CLASSES = ['car', 'bicycle', 'person']
+
+
+def make_sequence(num_objects, num_frames, rng):
+    """
+    Synthetic scene: objects crossing the image while approaching, with
+    box and depth noise. Returns per frame the (N, 6) detections, the
+    distances and the ground-truth object index of every detection.
+    """
+    start = rng.uniform([0, 150], [IMAGE_SIZE - 80, 220], (num_objects, 2))
+    speed = rng.uniform(-40, 40, (num_objects, 2)) * [1.0, 0.1]  # px/frame
+    size = rng.uniform(30, 90, num_objects)
+    dist0 = rng.uniform(6.0, 25.0, num_objects)
+    cls = rng.integers(0, len(CLASSES), num_objects)
+
+    frames = []
+    for f in range(num_frames):
+        dist = np.maximum(dist0 - 0.8 * f, 1.0)
+        scale = dist0 / dist
+        xy = start + speed * f
+        w = size * np.minimum(scale, 3.0)
+        boxes = np.stack([xy[:, 0], xy[:, 1], xy[:, 0] + w, xy[:, 1] + 0.6 * w], axis=1)
+        boxes += rng.normal(0, 2.0, boxes.shape)
+        boxes = boxes.clip(0, IMAGE_SIZE)
+
+        visible = (boxes[:, 2] - boxes[:, 0] > 4) & (rng.random(num_objects) > 0.05)
+        det = np.concatenate([boxes, rng.uniform(0.5, 0.95, (num_objects, 1)), cls[:, None]], axis=1)
+        noisy_dist = dist * (1.0 + rng.normal(0, 0.03, num_objects))
+        frames.append((det[visible].astype(np.float32), noisy_dist[visible], np.flatnonzero(visible)))
+    return frames
+
+
+def id_switches(assigned_ids, gt_indices):
+    """Times a ground-truth object changes id between two frames where it is seen"""
+    last = {}
+    switches = 0
+    for ids, gts in zip(assigned_ids, gt_indices):
+        for track_id, gt in zip(ids, gts):
+            if track_id < 0:
+                continue  # detection non (ancora) confermata dal tracker
+            if gt in last and last[gt] != track_id:
+                switches += 1
+            last[gt] = track_id
+    return switches
+
+
+def run_iou_tracker(frames, assignment):
+    tracker = IouDepthTracker(assignment=assignment)
+    latencies, assigned = [], []
+    for f, (det, dists, _) in enumerate(frames):
+        objects = [
+            {'class': CLASSES[int(d[5])], 'confidence': float(d[4]), 'bbox': d[:4].astype(int).tolist(), 'dist': float(z)}
+            for d, z in zip(det, dists)
+        ]
+        t0 = time.perf_counter()
+        tracker.update(objects, f * FRAME_DT)
+        latencies.append(time.perf_counter() - t0)
+        assigned.append([obj['id'] for obj in objects])
+    return np.array(latencies), assigned
+
+
+def run_bytetrack(frames):
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    class TrackerInput:
+        """Minimal Boxes-like view of a (N, 6) detection array for BYTETracker"""
+
+        def __init__(self, data):
+            self.xyxy = data[:, :4]
+            self.conf = data[:, 4]
+            self.cls = data[:, 5]
+
+        @property
+        def xywh(self):
+            xywh = self.xyxy.copy()
+            xywh[:, 2:] = self.xyxy[:, 2:] - self.xyxy[:, :2]
+            xywh[:, :2] = self.xyxy[:, :2] + xywh[:, 2:] / 2
+            return xywh
+
+        def __len__(self):
+            return len(self.xyxy)
+
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml(config.TRACKER_CONFIG)))
+    tracker = BYTETracker(args=cfg, frame_rate=30)
+    blank = np.zeros((IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8)
+    latencies, assigned = [], []
+    for det, _, _ in frames:
+        t0 = time.perf_counter()
+        tracks = tracker.update(TrackerInput(det), blank)
+        latencies.append(time.perf_counter() - t0)
+
+        # tracks: [x1, y1, x2, y2, track_id, score, cls, idx]
+        ids = [-1] * len(det)
+        for track in tracks:
+            ids[int(track[7])] = int(track[4])
+        assigned.append(ids)
+    return np.array(latencies), assigned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame cost and id switches: IouDepthTracker vs ByteTrack")
+    parser.add_argument('--objects', type=int, nargs='+', default=[2, 8, 32])
+    parser.add_argument('--frames', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'objects':>8} {'tracker':>20} {'mean us':>9} {'p95 us':>9} {'id switches':>12}")
+    for num_objects in args.objects:
+        frames = make_sequence(num_objects, args.frames, np.random.default_rng(0))
+        gt = [g for _, _, g in frames]
+
+        runs = [
+            ('iou-depth greedy', lambda: run_iou_tracker(frames, 'greedy')),
+            ('iou-depth hungarian', lambda: run_iou_tracker(frames, 'hungarian')),
+            ('bytetrack', lambda: run_bytetrack(frames)),
+        ]
+        for name, run in runs:
+            try:
+                latencies, assigned = run()
+            except ImportError as e:
+                print(f"{num_objects:>8} {name:>20} skipped ({e})")
+                continue
+            print(f"{num_objects:>8} {name:>20} {latencies.mean() * 1e6:>9.1f} "
+                  f"{np.percentile(latencies, 95) * 1e6:>9.1f} {id_switches(assigned, gt):>12}")
+
+
+if __name__ == '__main__':
+    main()
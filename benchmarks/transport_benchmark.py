@@ -0,0 +1,82 @@
+import argparse
+import threading
+import time
+import sys
+import os
+import numpy as np
+
+# Aggiungi la root del progetto al path per poter importare i moduli
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+from hmi.alert_codec import encode_alerts, decode_alerts
+from hmi.alert_transport import TRANSPORTS
+
+TOPIC = config.MQTT_TOPIC_ZONE_STATE.format(zone=config.RCTA_ZONES[0])
+
+
+def run_transport(name, messages, interval, connect_timeout=3.0):
+    """Publish -> on_message latency of one transport, publisher and subscriber in this process"""
+    publisher = TRANSPORTS[name]('publisher')
+    subscriber = TRANSPORTS[name]('subscriber')
+    latencies = []
+    received = threading.Event()
+
+    def on_message(topic, payload, retain):
+        if retain:
+            return  # stato retained di un run precedente
+        latencies.append(time.perf_counter() - decode_alerts(payload)['timestamp'])
+        if len(latencies) == messages:
+            received.set()
+
+    try:
+        subscriber.subscribe([TOPIC], on_message)
+        deadline = time.monotonic() + connect_timeout
+        while not (publisher.connected and subscriber.connected) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if not (publisher.connected and subscriber.connected):
+            return None
+        time.sleep(0.1)  # sottoscrizione attiva lato broker / socket accettato
+
+        obj = {'zone': config.RCTA_ZONES[0], 'alert_level': 'danger', 'class': 'car', 'distance': 4.2, 'ttc': 1.3}
+        for _ in range(messages):
+            # perf_counter come timestamp: stesso processo, clock monotono ad alta risoluzione
+            publisher.publish(TOPIC, encode_alerts([obj], time.perf_counter()))
+            time.sleep(interval)
+        received.wait(timeout=1.0)
+        return np.array(latencies), messages - len(latencies)
+    finally:
+        subscriber.close()
+        publisher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish -> receive latency of the alert transports")
+    parser.add_argument('--transports', nargs='+', default=list(TRANSPORTS))
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    print(f"{'transport':>10} {'mean us':>9} {'p95 us':>9} {'max us':>9} {'lost':>6}")
+    for name in args.transports:
+        try:
+            result = run_transport(name, args.messages, args.interval)
+        except (ImportError, OSError) as e:
+            print(f"{name:>10} skipped ({e})")
+            continue
+        if result is None:
+            print(f"{name:>10} skipped (not connected)")
+            continue
+        latencies, lost = result
+        if not len(latencies):
+            print(f"{name:>10} no messages received")
+            continue
+        print(f"{name:>10} {latencies.mean() * 1e6:>9.1f} {np.percentile(latencies, 95) * 1e6:>9.1f} "
+              f"{latencies.max() * 1e6:>9.1f} {lost:>6}")
+
+
+if __name__ == '__main__':
+    main()
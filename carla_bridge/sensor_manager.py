@@ -2,9 +2,46 @@ import carla
 import config
 
 
+def validate_zone_profile(zone, detector_imgsz=config.DETECTOR_IMGSZ):
+    """
+    Checks the RGB / depth profiles of a zone against each other and against
+    the detector input size. Raises ValueError for a profile the pipeline
+    cannot use, returns the warnings for the ones that waste rendering.
+    """
+    name = zone['name']
+    rgb, depth = zone['rgb'], zone['depth']
+    warnings = []
+
+    if detector_imgsz % 32 != 0:
+        raise ValueError(f"DETECTOR_IMGSZ={detector_imgsz} is not a multiple of the YOLOv8 stride (32)")
+    for modality, profile in (('rgb', rgb), ('depth', depth)):
+        if profile['width'] <= 0 or profile['height'] <= 0:
+            raise ValueError(f"Zone '{name}': invalid {modality} resolution {profile['width']}x{profile['height']}")
+
+    # I box RGB vengono riscalati sulla depth: stesso aspect ratio
+    if rgb['width'] * depth['height'] != depth['width'] * rgb['height']:
+        raise ValueError(
+            f"Zone '{name}': depth {depth['width']}x{depth['height']} does not have the aspect ratio "
+            f"of rgb {rgb['width']}x{rgb['height']}"
+        )
+
+    long_side = max(rgb['width'], rgb['height'])
+    if long_side > detector_imgsz:
+        warnings.append(f"rgb {rgb['width']}x{rgb['height']} is downscaled to {detector_imgsz}: "
+                        f"the extra pixels are rendered for nothing")
+    elif long_side < detector_imgsz // 2:
+        warnings.append(f"rgb {rgb['width']}x{rgb['height']} is upscaled more than 2x to {detector_imgsz}")
+    if depth['width'] > rgb['width']:
+        warnings.append("depth resolution higher than rgb, boxes only use the rgb resolution")
+
+    return warnings
+
+
 class SensorManager:
     """
     Manages camera sensors for RCTA system.
+    One RGB + one depth camera per zone of config.RCTA_ZONE_DEFINITIONS,
+    each modality with its own resolution profile.
     Sensors use sensor_tick to control update frequency.
     """
 
@@ -12,78 +49,63 @@ class SensorManager:
         self.world = world
         self.actor_list = actor_list
         self.blueprint_library = world.get_blueprint_library()
+        self._validated = set()  # zone gia' controllate (warning stampati una volta)
 
-    def setup_rcta_cameras(self, parent_vehicle):
-        # RGB camera blueprint
-        rgb_camera_bp = self.blueprint_library.find('sensor.camera.rgb')
-        rgb_camera_bp.set_attribute('image_size_x', str(config.CAMERA_IMAGE_WIDTH))
-        rgb_camera_bp.set_attribute('image_size_y', str(config.CAMERA_IMAGE_HEIGHT))
-        rgb_camera_bp.set_attribute('fov', config.CAMERA_FOV)
-        rgb_camera_bp.set_attribute('sensor_tick','0.3')
+    def _camera_blueprint(self, sensor_type, zone, sensor_tick=None):
+        profile = zone[sensor_type]
+        camera_bp = self.blueprint_library.find(f'sensor.camera.{sensor_type}')
+        camera_bp.set_attribute('image_size_x', str(profile['width']))
+        camera_bp.set_attribute('image_size_y', str(profile['height']))
+        camera_bp.set_attribute('fov', str(zone['fov']))
+        camera_bp.set_attribute('sensor_tick', str(sensor_tick if sensor_tick is not None else zone['sensor_tick']))
+        return camera_bp
 
-        # Depth camera blueprint
-        depth_camera_bp = self.blueprint_library.find('sensor.camera.depth')
-        depth_camera_bp.set_attribute('image_size_x', str(config.CAMERA_IMAGE_WIDTH))
-        depth_camera_bp.set_attribute('image_size_y', str(config.CAMERA_IMAGE_HEIGHT))
-        depth_camera_bp.set_attribute('fov', config.CAMERA_FOV)
-        depth_camera_bp.set_attribute('sensor_tick', '0.3')
-
-        # Spawn REAR cameras
-        print("SENSOR_MANAGER [Spawning REAR cameras]")
-        rear_rgb_cam = self.world.try_spawn_actor(
-            rgb_camera_bp,
-            config.REAR_CAMERA_TRANSFORM,
+    def spawn_zone_cameras(self, parent_vehicle, zone, sensor_tick=None):
+        """
+        RGB + depth camera of one zone, (None, None) if the spawn failed.
+        Raises ValueError if the zone profile is not usable (validate_zone_profile).
+        """
+        name = zone['name']
+        if name not in self._validated:
+            for warning in validate_zone_profile(zone):
+                print(f"SENSOR_MANAGER [Warning: zone {name}: {warning}]")
+            self._validated.add(name)
+        tick = sensor_tick if sensor_tick is not None else zone['sensor_tick']
+        print(f"SENSOR_MANAGER [Spawning {name.upper()} cameras "
+              f"(rgb {zone['rgb']['width']}x{zone['rgb']['height']}, "
+              f"depth {zone['depth']['width']}x{zone['depth']['height']}, tick {tick}s)]")
+        rgb_cam = self.world.try_spawn_actor(
+            self._camera_blueprint('rgb', zone, tick),
+            zone['transform'],
             attach_to=parent_vehicle
         )
-        rear_depth_cam = self.world.try_spawn_actor(
-            depth_camera_bp,
-            config.REAR_CAMERA_TRANSFORM,
+        depth_cam = self.world.try_spawn_actor(
+            self._camera_blueprint('depth', zone, tick),
+            zone['transform'],
             attach_to=parent_vehicle
         )
-        if rear_rgb_cam and rear_depth_cam:
-            self.actor_list.extend([rear_rgb_cam, rear_depth_cam])
-            print(f"SENSOR_MANAGER [REAR cameras spawned ]")
-        else:
-            print(f"SENSOR_MANAGER [ERROR: REAR cameras spawn failed]")
+        if rgb_cam and depth_cam:
+            self.actor_list.extend([rgb_cam, depth_cam])
+            print(f"SENSOR_MANAGER [{name.upper()} cameras spawned]")
+            return rgb_cam, depth_cam
 
-        # Spawn LEFT cameras
-        print("SENSOR_MANAGER [Spawning LEFT cameras]")
-        left_rgb_cam = self.world.try_spawn_actor(
-            rgb_camera_bp,
-            config.LEFT_CAMERA_TRANSFORM,
-            attach_to=parent_vehicle
-        )
-        left_depth_cam = self.world.try_spawn_actor(
-            depth_camera_bp,
-            config.LEFT_CAMERA_TRANSFORM,
-            attach_to=parent_vehicle
-        )
-        if left_rgb_cam and left_depth_cam:
-            self.actor_list.extend([left_rgb_cam, left_depth_cam])
-            print(f"SENSOR_MANAGER [LEFT cameras spawned]")
-        else:
-            print(f"SENSOR_MANAGER [ERROR: LEFT cameras spawn failed]")
+        print(f"SENSOR_MANAGER [ERROR: {name.upper()} cameras spawn failed]")
+        for camera in (rgb_cam, depth_cam):
+            if camera is not None:
+                camera.destroy()
+        return None, None
 
-        # Spawn RIGHT cameras
-        print("SENSOR_MANAGER [Spawning RIGHT cameras]")
-        right_rgb_cam = self.world.try_spawn_actor(
-            rgb_camera_bp,
-            config.RIGHT_CAMERA_TRANSFORM,
-            attach_to=parent_vehicle
-        )
-        right_depth_cam = self.world.try_spawn_actor(
-            depth_camera_bp,
-            config.RIGHT_CAMERA_TRANSFORM,
-            attach_to=parent_vehicle
-        )
-        if right_rgb_cam and right_depth_cam:
-            self.actor_list.extend([right_rgb_cam, right_depth_cam])
-            print(f"SENSOR_MANAGER [RIGHT cameras spawned]")
-        else:
-            print(f"SENSOR_MANAGER [ERROR: RIGHT cameras spawn failed]")
+    def destroy_zone_cameras(self, cameras):
+        for camera in cameras:
+            if camera is None:
+                continue
+            if camera.is_listening:
+                camera.stop()
+            if camera in self.actor_list:
+                self.actor_list.remove(camera)
+            if camera.is_alive:
+                camera.destroy()
 
-        return (
-            rear_rgb_cam, rear_depth_cam,
-            left_rgb_cam, left_depth_cam,
-            right_rgb_cam, right_depth_cam
-        )
\ No newline at end of file
+    def setup_rcta_cameras(self, parent_vehicle, zone_definitions=config.RCTA_ZONE_DEFINITIONS):
+        """Returns {zone name: (rgb camera, depth camera)}, None for a failed spawn"""
+        return {zone['name']: self.spawn_zone_cameras(parent_vehicle, zone) for zone in zone_definitions}
@@ -0,0 +1,137 @@
+import config
+
+MODE_IDLE = 'idle'      # nessuna camera: niente rendering ne' trasferimento
+MODE_ACTIVE = 'active'  # retromarcia: sensor_tick del registro
+MODE_ALERT = 'alert'    # track a livello danger o retromarcia veloce: rate massimo
+_MODE_RANK = {MODE_IDLE: 0, MODE_ACTIVE: 1, MODE_ALERT: 2}
+
+
+class SensorRateController:
+    """
+    Adapts the zone cameras to the driving situation.
+    Not in reverse the cameras are destroyed, in reverse they run at the
+    registry sensor_tick, and with a danger-level alert or when reversing
+    faster than fast_reverse_mps they are respawned at the alert tick
+    (sensor_tick is fixed at spawn time in CARLA).
+    A rate change spawns the new cameras first and destroys the old ones only
+    once the new ones delivered a frame (or after handover_timeout_sec), so
+    switching to the alert rate leaves no frame gap.
+    Going up is immediate, going down waits for the situation to hold for
+    downgrade_hold_sec, so gear toggles while maneuvering or a flickering
+    alert do not respawn the cameras at every tick.
+    """
+
+    def __init__(self, sensor_manager, parent_vehicle, listen_fn,
+                 zone_definitions=config.RCTA_ZONE_DEFINITIONS,
+                 alert_tick=config.SENSOR_RATE_ALERT_TICK,
+                 downgrade_hold_sec=config.SENSOR_RATE_DOWNGRADE_HOLD_SEC,
+                 forward_speed_mps=config.SENSOR_RATE_FORWARD_SPEED_MPS,
+                 fast_reverse_mps=config.SENSOR_RATE_FAST_REVERSE_MPS,
+                 handover_timeout_sec=config.SENSOR_RATE_HANDOVER_TIMEOUT_SEC):
+        # listen_fn(zone, sensor_type, image): callback of the sensors
+        self.sensor_manager = sensor_manager
+        self.parent_vehicle = parent_vehicle
+        self.listen_fn = listen_fn
+        self.zone_definitions = list(zone_definitions)
+        self.alert_tick = alert_tick
+        self.downgrade_hold_sec = downgrade_hold_sec
+        self.forward_speed_mps = forward_speed_mps
+        self.fast_reverse_mps = fast_reverse_mps
+        self.handover_timeout_sec = handover_timeout_sec
+
+        self.mode = MODE_IDLE
+        self.cameras = {}  # zone -> (rgb, depth)
+        self.generation = 0  # set di camere corrente, marcato nei listener
+        self._replaced = {}  # zone -> (camere da distruggere, istante del cambio)
+        self._delivered = set()  # zone le cui nuove camere hanno gia' inviato un frame
+        self._downgrade_since = None
+        self.mode_changes = 0
+
+        print(f"SENSOR_RATE_CONTROLLER [Initialized: alert tick {alert_tick}s, hold {downgrade_hold_sec}s]")
+
+    def target_mode(self, reverse, speed, alert_level):
+        if not reverse:
+            return MODE_IDLE
+        # speed con segno, negativa in retromarcia: piu' veloce = ostacoli raggiunti prima
+        if alert_level == "danger" or -speed > self.fast_reverse_mps:
+            return MODE_ALERT
+        return MODE_ACTIVE
+
+    def update(self, reverse, speed, alert_level, sim_time):
+        """Called once per world tick with the ego state and the highest current alert level"""
+        self._retire_replaced(sim_time)
+        target = self.target_mode(reverse, speed, alert_level)
+        if target == self.mode:
+            self._downgrade_since = None
+            return
+
+        if _MODE_RANK[target] < _MODE_RANK[self.mode]:
+            # Marcia avanti decisa: le camere non servono, nessuna attesa
+            driving_away = not reverse and speed > self.forward_speed_mps
+            if not driving_away:
+                if self._downgrade_since is None:
+                    self._downgrade_since = sim_time
+                if sim_time - self._downgrade_since < self.downgrade_hold_sec:
+                    return
+
+        self._apply(target, sim_time)
+
+    def _on_image(self, zone, generation, sensor_type, image):
+        if generation == self.generation:
+            self._delivered.add(zone)
+        self.listen_fn(zone, sensor_type, image)
+
+    def _retire_replaced(self, sim_time):
+        """Destroys the previous cameras of the zones whose new cameras are already streaming"""
+        for zone, (cameras, since) in list(self._replaced.items()):
+            if zone in self._delivered or sim_time - since > self.handover_timeout_sec:
+                self.sensor_manager.destroy_zone_cameras(cameras)
+                del self._replaced[zone]
+
+    def _apply(self, mode, sim_time):
+        print(f"SENSOR_RATE_CONTROLLER [{self.mode} -> {mode}]")
+        # Un cambio ancora in corso: le camere di due generazioni fa non servono piu'
+        for cameras, _ in self._replaced.values():
+            self.sensor_manager.destroy_zone_cameras(cameras)
+        self._replaced = {}
+        previous = self.cameras
+        self.cameras = {}
+        self.generation += 1
+        self._delivered = set()
+
+        if mode != MODE_IDLE:
+            for zone in self.zone_definitions:
+                tick = zone['sensor_tick']
+                if mode == MODE_ALERT:
+                    tick = min(float(tick), float(self.alert_tick))
+                rgb_cam, depth_cam = self.sensor_manager.spawn_zone_cameras(self.parent_vehicle, zone, tick)
+                if rgb_cam is None:
+                    continue
+                name = zone['name']
+                generation = self.generation
+                rgb_cam.listen(lambda image, name=name, generation=generation:
+                               self._on_image(name, generation, "rgb", image))
+                depth_cam.listen(lambda image, name=name, generation=generation:
+                                 self._on_image(name, generation, "depth", image))
+                self.cameras[name] = (rgb_cam, depth_cam)
+
+        for name, cameras in previous.items():
+            if name in self.cameras:
+                # Le vecchie camere restano attive fino al primo frame delle nuove
+                self._replaced[name] = (cameras, sim_time)
+            else:
+                self.sensor_manager.destroy_zone_cameras(cameras)
+
+        self.mode = mode
+        self._downgrade_since = None
+        self.mode_changes += 1
+
+    def stop(self):
+        for cameras in list(self.cameras.values()) + [cameras for cameras, _ in self._replaced.values()]:
+            self.sensor_manager.destroy_zone_cameras(cameras)
+        self.cameras = {}
+        self._replaced = {}
+        self.mode = MODE_IDLE
+
+    def get_stats(self):
+        return {'mode': self.mode, 'mode_changes': self.mode_changes}
@@ -12,7 +12,31 @@ TIMEOUT = 10
 #_____________________________________MQTT SETTING________________________
 MQTT_BROKER = HOST
 MQTT_PORT = 1883
-MQTT_TOPIC_ALERTS = "rcta/alerts"
+MQTT_TOPIC_ALERTS = "rcta/alerts"  # stream di eventi, tutte le zone
+MQTT_TOPIC_ZONE_STATE = "rcta/zone/{zone}/state"  # stato retained di una zona
+# Un messaggio per tick con tutte le zone, solo ai cambi di stato + heartbeat.
+# Latenza massima di un cambio: un tick + 1 / MQTT_MAX_PUBLISH_RATE_HZ
+MQTT_MAX_PUBLISH_RATE_HZ = 10.0
+MQTT_HEARTBEAT_SEC = 0.5  # per zona, + 1 / MQTT_MAX_PUBLISH_RATE_HZ deve restare < timeout zona dell'HMI
+MQTT_ZONE_STALE_SEC = 0.7  # zona senza report da piu' di (tempo simulato): clear
+MQTT_DEDUP_DIST_STEP_M = 0.5  # variazioni di distanza sotto il passo non vengono ripubblicate
+# Formato dei messaggi (hmi/alert_codec.py): "binary" (struct versionato) o "json".
+# L'HMI riconosce il formato dal primo byte e li accetta entrambi
+MQTT_ALERT_FORMAT = "binary"
+# Classi rilevate e inviate all'HMI: l'ordine e' l'enum del formato binario
+ALERT_CLASSES = ('person', 'bicycle', 'car', 'bus', 'truck')
+
+#_____________________________________ALERT TRANSPORT SETTING________________________
+# Trasporto publisher -> HMI (hmi/alert_transport.py), stessi topic e payload per tutti:
+# "mqtt" (broker), "inproc" (stesso processo), "shm" (ring in memoria condivisa, stesso host),
+# "socket" (stream Unix/TCP, senza broker)
+ALERT_TRANSPORT = "mqtt"
+ALERT_SHM_PATH = "/dev/shm/rcta_alerts"
+ALERT_SHM_SLOTS = 64  # > messaggi per heartbeat: gli stati retained restano nel ring
+ALERT_SHM_SLOT_SIZE = 1024
+ALERT_SHM_POLL_SEC = 0.002
+ALERT_SOCKET_ADDRESS = "unix:/tmp/rcta_alerts.sock"  # oppure "tcp:127.0.0.1:1884"
+ALERT_SOCKET_SEND_TIMEOUT_SEC = 0.05  # un display piu' lento viene disconnesso
 
 #_____________________________________SCENARIO SETTING________________________
 MAP_NAME = 'Town05'
@@ -92,10 +116,137 @@ RIGHT_CAMERA_TRANSFORM = carla.Transform(
     COMMON_REAR_LOCATION,
     carla.Rotation(yaw=120)
 )
+CAMERA_SENSOR_TICK = "0.3"
+
+# Profili di risoluzione per modalita'. FOV e sensor_tick sono per zona: RGB e depth
+# devono avere la stessa geometria e catturare sugli stessi frame (FrameSynchronizer).
+# Un'altezza minore della larghezza mantiene il FOV orizzontale e renderizza solo la
+# fascia centrale dell'immagine (crop sulla strada).
+RGB_PROFILE = {"width": CAMERA_IMAGE_WIDTH, "height": CAMERA_IMAGE_HEIGHT}
+# La depth serve solo per la distanza dei box: mezza risoluzione, 1/4 dei pixel
+DEPTH_PROFILE = {"width": CAMERA_IMAGE_WIDTH // 2, "height": CAMERA_IMAGE_HEIGHT // 2}
+
+# Registro delle zone RCTA: ogni zona ha una camera RGB e una depth con la stessa posa.
+# Per una nuova camera (trailer, angoli, ...) basta aggiungere una voce, es.
+# {"name": "trailer", "transform": carla.Transform(carla.Location(x=-6.0, z=1.2), carla.Rotation(yaw=180)), ...}
+RCTA_ZONE_DEFINITIONS = [
+    {"name": "rear", "transform": REAR_CAMERA_TRANSFORM, "fov": CAMERA_FOV,
+     "sensor_tick": CAMERA_SENSOR_TICK, "rgb": RGB_PROFILE, "depth": DEPTH_PROFILE},
+    {"name": "left", "transform": LEFT_CAMERA_TRANSFORM, "fov": CAMERA_FOV,
+     "sensor_tick": CAMERA_SENSOR_TICK, "rgb": RGB_PROFILE, "depth": DEPTH_PROFILE},
+    {"name": "right", "transform": RIGHT_CAMERA_TRANSFORM, "fov": CAMERA_FOV,
+     "sensor_tick": CAMERA_SENSOR_TICK, "rgb": RGB_PROFILE, "depth": DEPTH_PROFILE},
+]
+
+# Rate adattivo delle camere (carla_bridge/sensor_rate_controller.py):
+# nessuna camera fuori dalla retromarcia, sensor_tick del registro in retromarcia,
+# SENSOR_RATE_ALERT_TICK con un allarme danger
+SENSOR_RATE_CONTROL_ENABLED = True
+SENSOR_RATE_ALERT_TICK = "0.1"
+SENSOR_RATE_DOWNGRADE_HOLD_SEC = 2.0  # isteresi prima di scendere di rate
+SENSOR_RATE_FORWARD_SPEED_MPS = 1.0  # marcia avanti oltre questa velocita': camere spente subito
+SENSOR_RATE_FAST_REVERSE_MPS = 2.0  # retromarcia oltre questa velocita': rate massimo anche senza allarmi
+SENSOR_RATE_HANDOVER_TIMEOUT_SEC = 1.0  # camere vecchie distrutte al primo frame delle nuove o dopo questo tempo
+ALERT_LEVEL_TTL_SEC = 1.0  # un allarme conta per il rate fino a questa eta'
 YOLO_MODEL_PATH = 'models/yolov8n.pt'
 
+#_____________________________________DETECTOR SETTING________________________
+# Backend di inferenza: 'ultralytics' | 'onnxruntime' | 'openvino' | 'torchscript'
+# onnxruntime e openvino non sono in requirements.txt: pip install -r requirements-optional.txt
+DETECTOR_BACKEND = 'ultralytics'
+# Modelli esportati con: yolo export model=models/yolov8n.pt format=<onnx|openvino|torchscript>
+DETECTOR_MODEL_PATHS = {
+    'ultralytics': YOLO_MODEL_PATH,
+    'onnxruntime': 'models/yolov8n.onnx',
+    'openvino': 'models/yolov8n_openvino_model/yolov8n.xml',
+    'torchscript': 'models/yolov8n.torchscript',
+    'onnxruntime-int8': 'models/yolov8n_int8.onnx'
+}
+DETECTOR_IMGSZ = 640  # deve coincidere con imgsz usato nell'export
+DETECTOR_CONFIDENCE = 0.5
+DETECTOR_IOU = 0.7
+DETECTOR_NUM_THREADS = 0  # 0 = default del runtime
+
+# Quantizzazione INT8: frame registrati in <dir>/{rear,left,right}/*.png
+# Richiede onnx e onnxruntime (requirements-optional.txt)
+QUANTIZATION_FRAMES_DIR = 'recordings'
+QUANTIZATION_MAX_FRAMES = 300
+# Registrazione dei frame RGB per la calibrazione (None = disattivata)
+RECORD_FRAMES_DIR = None
+RECORD_EVERY_N_FRAMES = 10
+
+#_____________________________________INFERENCE SETTING________________________
+RCTA_ZONES = [zone["name"] for zone in RCTA_ZONE_DEFINITIONS]
+HMI_ZONES = list(RCTA_ZONES)  # zone mostrate (e sottoscritte) da hmi_display
+# Tempo massimo di attesa per completare un batch con i frame di tutte le zone
+INFERENCE_BATCH_WINDOW_SEC = 0.05
+# Code per zona (drop-oldest) e numero di worker della pipeline
+ZONE_QUEUE_SIZE = 2
+ZONE_WORKERS = len(RCTA_ZONES)  # un worker per zona
+# Buffer di riordino RGB/Depth per stream e timeout dei frame senza coppia
+SYNC_BUFFER_SIZE = 4
+SYNC_TIMEOUT_SEC = 1.0
+# Buffer BGR/depth pre-allocati per zona (una zona e' processata da un worker alla volta)
+FRAME_POOL_SLOTS = 2
+
+#_____________________________________DEPTH SETTING________________________
+# Metodo per il percentile della distanza nel ROI: 'exact' | 'select' | 'histogram'
+# 'histogram' interpola tra i rank adiacenti come np.percentile: differisce da 'exact'
+# solo per la quantizzazione del codice (bin fine di 16 codici, <= 0.5 mm sul valore di ogni rank)
+ROI_QUANTILE_METHOD = 'histogram'
+# Massimo numero di pixel campionati per box (0 = tutti i pixel): costo per box
+# costante, errore misurato < 2 cm sui box dei run CAR (benchmarks/roi_quantile_benchmark.py)
+ROI_MAX_SAMPLES = 4096
+
+#_____________________________________OCCUPANCY GATE SETTING________________________
+# Pre-filtro sulla depth: YOLO gira solo se nella banda stradale c'e' qualcosa
+# di nuovo o in avvicinamento entro GATE_RANGE_M
+GATE_ENABLED = True
+GATE_RANGE_M = 20.0
+GATE_ROW_BAND = (0.35, 0.85)  # frazione dell'altezza immagine (da, a)
+GATE_CELL_PX = 8
+GATE_CLOSING_DELTA_M = 0.3
+GATE_MIN_CELLS = 2
+GATE_MAX_SKIPPED_FRAMES = 10
+
+#_____________________________________PROPAGATION SETTING________________________
+# YOLO ogni N frame, in mezzo i box vengono propagati con la depth
+PROPAGATION_ENABLED = True
+PROPAGATION_KEYFRAME_INTERVAL = 3
+# Errore relativo distanza misurata/predetta a cui la confidenza arriva a 0
+PROPAGATION_MAX_REL_ERROR = 0.3
+PROPAGATION_MIN_CONFIDENCE = 0.3
+
+#_____________________________________TRACKING SETTING________________________
+# Slot iniziali della track table di ogni zona (raddoppia se piena)
+TRACK_TABLE_CAPACITY = 64
+# Campioni (time, dist) per track usati nella regressione della velocita' / TTC
+TTC_HISTORY_LENGTH = 5
+# Tracker IoU + depth di ogni zona (rcta_system/iou_tracker.py)
+TRACKER_ASSIGNMENT = 'greedy'  # 'greedy' o 'hungarian' (scipy)
+TRACKER_IOU_WEIGHT = 0.7  # peso dell'IoU nel costo, il resto e' la coerenza della depth
+TRACKER_MIN_IOU = 0.1
+TRACKER_MAX_DEPTH_REL_DIFF = 0.3
+TRACKER_MAX_AGE_SEC = 1.0
+# ByteTrack di ultralytics, riferimento del tracker: solo per i benchmark (benchmarks/tracker_benchmark.py)
+TRACKER_CONFIG = 'bytetrack.yaml'
+# Tracker unico nel frame ego: gli oggetti passano da una camera all'altra con lo stesso id
+EGO_TRACKING_ENABLED = True
+EGO_TRACKER_GATE_M = 2.0  # distanza massima track predetto / detection
+EGO_TRACKER_MAX_AGE_SEC = 1.0
+EGO_TRACKER_ROUND_WINDOW_SEC = 0.05  # attesa massima delle altre zone dello stesso tick
+
 #_____________________________________RCTA SETTING________________________
 TTC_THRESHOLD = 3.5 #secondi
 DIST_THRESHOLD = 2.5 #metri
+# Valutazione CPA (closest point of approach) con il moto dell'ego al posto della soglia TTC per zona (DIST_THRESHOLD resta)
+CPA_EVALUATOR_ENABLED = True
+CPA_HORIZON_SEC = 5.0
+CPA_TIME_STEP_SEC = 0.1
+CPA_MARGIN_M = 0.5  # distanza minima dalla sagoma dell'ego che conta come intersezione
+EGO_HALF_LENGTH_M = 2.4
+EGO_HALF_WIDTH_M = 1.0
+EGO_WHEELBASE_M = 2.9
+EGO_MAX_STEER_DEG = 70.0
 
 
@@ -0,0 +1,109 @@
+"""
+Wire format of the alert messages.
+
+JSON (fallback): {"alert": bool, "timestamp": float, "objects": [...]},
+non-finite distance / TTC are sent as null (standard JSON, no Infinity token).
+
+Binary (little endian), recognised by the first byte (JSON always starts with '{'):
+    header: magic u8, version u8, flags u8 (bit 0 = alert), timestamp f64, count u8
+    object: zone u8, alert_level u8, class u8, distance f32, ttc f32
+Zone and class are indexes in config.RCTA_ZONES / config.ALERT_CLASSES,
+both ends read the same config. A version change means a new layout.
+"""
+
+import json
+import math
+import struct
+import sys
+import os
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+
+BINARY_MAGIC = 0xA5
+BINARY_VERSION = 1
+UNKNOWN_INDEX = 0xFF
+
+_HEADER = struct.Struct('<BBBdB')
+_OBJECT = struct.Struct('<BBBff')
+_FLAG_ALERT = 0x01
+
+ALERT_LEVELS = ("warning", "danger")
+
+_ZONE_INDEX = {zone: i for i, zone in enumerate(config.RCTA_ZONES)}
+_LEVEL_INDEX = {level: i for i, level in enumerate(ALERT_LEVELS)}
+_CLASS_INDEX = {cls: i for i, cls in enumerate(config.ALERT_CLASSES)}
+
+
+def _lookup(names, index):
+    return names[index] if index < len(names) else "unknown"
+
+
+def encode_alerts(objects, timestamp, fmt=FORMAT_BINARY):
+    """Payload of an alert message with the given objects (empty: all clear)"""
+    if fmt == FORMAT_BINARY:
+        objects = objects[:255]  # count su un byte
+        parts = [_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, _FLAG_ALERT if objects else 0, timestamp, len(objects))]
+        for obj in objects:
+            parts.append(_OBJECT.pack(
+                _ZONE_INDEX.get(obj['zone'], UNKNOWN_INDEX),
+                _LEVEL_INDEX.get(obj['alert_level'], UNKNOWN_INDEX),
+                _CLASS_INDEX.get(obj['class'], UNKNOWN_INDEX),
+                obj['distance'],
+                obj['ttc']
+            ))
+        return b''.join(parts)
+
+    if fmt == FORMAT_JSON:
+        message = {
+            "alert": bool(objects),
+            "timestamp": timestamp,
+            "objects": [
+                {key: (None if isinstance(value, float) and not math.isfinite(value) else value)
+                 for key, value in obj.items()}
+                for obj in objects
+            ]
+        }
+        return json.dumps(message, allow_nan=False).encode()
+
+    raise ValueError(f"Unknown alert format: {fmt}")
+
+
+def decode_alerts(payload):
+    """
+    Message dict of a payload in any supported format, distance / TTC
+    always floats (inf when unknown). Raises ValueError on a malformed payload.
+    """
+    if payload[:1] == bytes([BINARY_MAGIC]):
+        if len(payload) < _HEADER.size:
+            raise ValueError("Truncated binary alert header")
+        _, version, flags, timestamp, count = _HEADER.unpack_from(payload)
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported binary alert version {version}")
+        if len(payload) != _HEADER.size + count * _OBJECT.size:
+            raise ValueError("Truncated binary alert payload")
+        objects = [
+            {
+                "zone": _lookup(config.RCTA_ZONES, zone),
+                "alert_level": _lookup(ALERT_LEVELS, level),
+                "class": _lookup(config.ALERT_CLASSES, cls),
+                "distance": distance,
+                "ttc": ttc
+            }
+            for zone, level, cls, distance, ttc in _OBJECT.iter_unpack(payload[_HEADER.size:])
+        ]
+        return {"alert": bool(flags & _FLAG_ALERT), "timestamp": timestamp, "objects": objects}
+
+    message = json.loads(payload)
+    for obj in message.get("objects", []):
+        for key in ("distance", "ttc"):
+            if obj.get(key) is None:
+                obj[key] = float('inf')
+    return message
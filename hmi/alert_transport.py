@@ -0,0 +1,477 @@
+"""
+Transports of the alert messages between MQTTPublisher and hmi_display.
+Every transport moves (topic, payload, retain) messages, with the MQTT
+retained semantics: the last retained payload of a topic is delivered to a
+subscriber when it subscribes (retain=True), an empty retained payload
+clears it; live messages are delivered with retain=False.
+
+    publish(topic, payload, retain) -> bool   (publisher side)
+    subscribe(topics, on_message)             (subscriber side, on_message(topic, payload, retain))
+    close()
+"""
+import mmap
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+
+script_dir = os.path.dirname(__file__)
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import config
+
+
+class MqttTransport:
+    """Mosquitto broker (config.MQTT_BROKER), the only transport across hosts"""
+
+    def __init__(self, role, broker=config.MQTT_BROKER, port=config.MQTT_PORT):
+        import paho.mqtt.client as mqtt
+        self._mqtt = mqtt
+        self.role = role
+        self.broker = broker
+        self.port = port
+        self.connected = False
+        self._topics = []
+        self._on_message = None
+        self._last_info = None
+
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self.client.on_connect = self._handle_connect
+        self.client.on_disconnect = self._handle_disconnect
+        self.client.on_message = self._handle_message
+
+        # Try to connect
+        try:
+            self.client.connect(self.broker, self.port, 60)
+            self.client.loop_start()  # Start background thread
+            print(f"MQTT_TRANSPORT [Connecting to {self.broker}:{self.port}...]")
+        except Exception as e:
+            print(f"MQTT_TRANSPORT [ERROR: Could not connect to broker: {e}]")
+
+    def _handle_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code == 0:
+            self.connected = True
+            print(f"MQTT_TRANSPORT [Connected successfully to {self.broker}]")
+            if self._topics:
+                # Anche alle riconnessioni: il broker rimanda gli stati retained
+                client.subscribe([(topic, 1) for topic in self._topics])
+                print(f"MQTT_TRANSPORT [Subscribed at the topics {self._topics}]")
+        else:
+            print(f"MQTT_TRANSPORT [Connection failed: {reason_code}]")
+
+    def _handle_disconnect(self, client, userdata, reason_code, properties):
+        self.connected = False
+        print(f"MQTT_TRANSPORT [Disconnected: {reason_code}]")
+
+    def _handle_message(self, client, userdata, msg):
+        if self._on_message is not None:
+            self._on_message(msg.topic, msg.payload, msg.retain)
+
+    def publish(self, topic, payload, retain=False):
+        if not self.connected:
+            # Not connected, skip publishing (but don't block)
+            return False
+        try:
+            result = self.client.publish(topic, payload, qos=1, retain=retain)  # At least once delivery
+            if result.rc == self._mqtt.MQTT_ERR_SUCCESS:
+                self._last_info = result
+                return True
+            print(f"MQTT_TRANSPORT [ERROR: Publish failed with code {result.rc}]")
+        except Exception as e:
+            print(f"MQTT_TRANSPORT [ERROR: {e}]")
+        return False
+
+    def subscribe(self, topics, on_message):
+        self._topics = list(topics)
+        self._on_message = on_message
+        if self.connected:
+            self.client.subscribe([(topic, 1) for topic in self._topics])
+
+    def close(self):
+        if self._last_info is not None and self.connected:
+            # I messaggi QoS 1 ancora in volo (es. gli stati retained cancellati allo shutdown)
+            self._last_info.wait_for_publish(timeout=1.0)
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.connected = False
+
+
+class _InProcessBus:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.retained = {}
+        self.subscribers = []  # (topics, queue)
+
+
+_BUS = _InProcessBus()
+
+
+class InProcessTransport:
+    """
+    Queue between threads of the same process, no broker and no copies:
+    HMI embedded in the simulation process and end-to-end runs without Mosquitto.
+    """
+
+    def __init__(self, role, bus=_BUS):
+        self.role = role
+        self.bus = bus
+        self.connected = True
+        self._queue = None
+        self._thread = None
+
+    def publish(self, topic, payload, retain=False):
+        with self.bus.lock:
+            if retain:
+                if payload:
+                    self.bus.retained[topic] = payload
+                else:
+                    self.bus.retained.pop(topic, None)
+            for topics, q in self.bus.subscribers:
+                if topic in topics:
+                    q.put((topic, payload, False))
+        return True
+
+    def subscribe(self, topics, on_message):
+        topics = set(topics)
+        self._queue = queue.Queue()
+        with self.bus.lock:
+            for topic in topics & set(self.bus.retained):
+                self._queue.put((topic, self.bus.retained[topic], True))
+            self.bus.subscribers.append((topics, self._queue))
+        self._thread = threading.Thread(target=self._deliver, args=(on_message,), daemon=True)
+        self._thread.start()
+
+    def _deliver(self, on_message):
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            on_message(*message)
+
+    def close(self):
+        if self._queue is not None:
+            with self.bus.lock:
+                self.bus.subscribers = [s for s in self.bus.subscribers if s[1] is not self._queue]
+            self._queue.put(None)
+            self._thread.join(timeout=1.0)
+        self.connected = False
+
+
+class SharedMemoryRingTransport:
+    """
+    Ring of fixed-size slots in a memory-mapped file (/dev/shm) for HMI
+    processes on the same host: the publisher writes without system calls
+    or waiting for readers, readers poll the write counter.
+    Single writer. Every slot carries the number of its message, zeroed while
+    it is written, so a reader detects slots overwritten during the read.
+    On subscribe the latest retained message of each topic still in the
+    ring is replayed (the heartbeat keeps them in the ring).
+    The publisher unlinks the ring file on close, readers reopen the new
+    ring when a publisher creates it again.
+    """
+
+    _HEADER = struct.Struct('<IIIIQ')  # magic, slots, slot_size, padding, write counter
+    _SLOT = struct.Struct('<QHIB')  # numero messaggio, topic_len, payload_len, retain
+    _MAGIC = 0x52435441
+    _COUNTER_OFFSET = 16
+
+    def __init__(self, role, path=config.ALERT_SHM_PATH, slots=config.ALERT_SHM_SLOTS,
+                 slot_size=config.ALERT_SHM_SLOT_SIZE, poll_sec=config.ALERT_SHM_POLL_SEC):
+        self.role = role
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.poll_sec = poll_sec
+        self.size = self._HEADER.size + slots * slot_size
+        self.connected = False
+        self.lost = 0
+        self._mm = None
+        self._inode = None
+        self._running = False
+        self._thread = None
+
+        if role == 'publisher':
+            with open(path, 'a+b') as f:
+                f.truncate(self.size)
+            with open(path, 'r+b') as f:
+                self._mm = mmap.mmap(f.fileno(), self.size)
+            self._mm[:] = bytes(self.size)
+            self._HEADER.pack_into(self._mm, 0, self._MAGIC, slots, slot_size, 0, 0)
+            self._count = 0
+            self.connected = True
+            print(f"SHM_TRANSPORT [Ring {path}: {slots} slots x {slot_size} bytes]")
+
+    def _slot_offset(self, number):
+        return self._HEADER.size + ((number - 1) % self.slots) * self.slot_size
+
+    def publish(self, topic, payload, retain=False):
+        topic = topic.encode()
+        if self._SLOT.size + len(topic) + len(payload) > self.slot_size:
+            print(f"SHM_TRANSPORT [ERROR: Message of {len(payload)} bytes larger than a slot]")
+            return False
+        number = self._count + 1
+        offset = self._slot_offset(number)
+        self._SLOT.pack_into(self._mm, offset, 0, len(topic), len(payload), int(retain))
+        data_offset = offset + self._SLOT.size
+        self._mm[data_offset:data_offset + len(topic) + len(payload)] = topic + payload
+        struct.pack_into('<Q', self._mm, offset, number)
+        # Contatore per ultimo: i lettori vedono solo slot completi
+        struct.pack_into('<Q', self._mm, self._COUNTER_OFFSET, number)
+        self._count = number
+        return True
+
+    def _read_slot(self, number):
+        offset = self._slot_offset(number)
+        seq, topic_len, payload_len, retain = self._SLOT.unpack_from(self._mm, offset)
+        if seq != number or self._SLOT.size + topic_len + payload_len > self.slot_size:
+            return None
+        data_offset = offset + self._SLOT.size
+        data = self._mm[data_offset:data_offset + topic_len + payload_len]
+        if struct.unpack_from('<Q', self._mm, offset)[0] != number:
+            return None  # riscritto durante la lettura
+        return data[:topic_len].decode(), data[topic_len:], bool(retain)
+
+    def _open_reader(self):
+        try:
+            with open(self.path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                inode = os.fstat(f.fileno()).st_ino
+        except (OSError, ValueError):
+            return False
+        magic, slots, slot_size, _, _ = self._HEADER.unpack_from(mm, 0)
+        if magic != self._MAGIC:
+            mm.close()
+            return False
+        self.slots, self.slot_size, self._mm, self._inode = slots, slot_size, mm, inode
+        return True
+
+    def _ring_replaced(self):
+        """True when the mapped ring was unlinked (publisher closed) or replaced by a new one"""
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except OSError:
+            return True
+
+    def subscribe(self, topics, on_message):
+        self._running = True
+        self._thread = threading.Thread(target=self._poll, args=(set(topics), on_message), daemon=True)
+        self._thread.start()
+
+    def _poll(self, topics, on_message):
+        while self._running:
+            while self._running and not self._open_reader():
+                time.sleep(0.5)  # publisher non ancora avviato
+            if not self._running:
+                return
+            self.connected = True
+            print(f"SHM_TRANSPORT [Reading ring {self.path}]")
+            self._read_ring(topics, on_message)
+            if not self._running:
+                return
+            # Ring rimosso dal publisher: si attende il prossimo
+            self.connected = False
+            self._mm.close()
+            self._mm = None
+
+    def _read_ring(self, topics, on_message):
+        """Replays the retained state, then follows the ring until it is closed or replaced"""
+        # Stato retained ancora nel ring
+        count = struct.unpack_from('<Q', self._mm, self._COUNTER_OFFSET)[0]
+        retained = {}
+        for number in range(max(1, count - self.slots + 1), count + 1):
+            message = self._read_slot(number)
+            if message is not None and message[2] and message[0] in topics:
+                retained[message[0]] = message
+        for message in retained.values():
+            on_message(*message)
+
+        next_number = count + 1
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                if self._ring_replaced():
+                    return
+            count = struct.unpack_from('<Q', self._mm, self._COUNTER_OFFSET)[0]
+            if count < next_number - 1:
+                next_number = 1  # publisher riavviato
+            if count - next_number + 1 > self.slots:
+                self.lost += count - next_number + 1 - self.slots
+                next_number = count - self.slots + 1
+            for number in range(next_number, count + 1):
+                message = self._read_slot(number)
+                if message is None:
+                    self.lost += 1
+                elif message[0] in topics:
+                    on_message(message[0], message[1], False)
+            next_number = count + 1
+            time.sleep(self.poll_sec)
+
+    def close(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self.role == 'publisher' and self.connected:
+            # Niente ring vecchio per i run successivi
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        self.connected = False
+
+
+def _parse_address(address):
+    """'unix:/path/to.sock' or 'tcp:host:port' -> (family, sockaddr)"""
+    kind, _, rest = address.partition(':')
+    if kind == 'unix':
+        return socket.AF_UNIX, rest
+    if kind == 'tcp':
+        host, _, port = rest.rpartition(':')
+        return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Unknown socket address '{address}', use 'unix:<path>' or 'tcp:<host>:<port>'")
+
+
+class SocketTransport:
+    """
+    Length-prefixed stream over a Unix or TCP socket. The publisher listens
+    and sends every message to all the connected displays; a display that
+    connects first receives the retained messages.
+    """
+
+    _FRAME = struct.Struct('<HIB')  # topic_len, payload_len, retain
+
+    def __init__(self, role, address=config.ALERT_SOCKET_ADDRESS, send_timeout=config.ALERT_SOCKET_SEND_TIMEOUT_SEC):
+        self.role = role
+        self.family, self.sockaddr = _parse_address(address)
+        self.send_timeout = send_timeout
+        self.connected = False
+        self._lock = threading.Lock()
+        self._clients = []
+        self._retained = {}
+        self._running = True
+        self._sock = None
+        self._thread = None
+
+        if role == 'publisher':
+            if self.family == socket.AF_UNIX and os.path.exists(self.sockaddr):
+                os.unlink(self.sockaddr)
+            self._sock = socket.socket(self.family, socket.SOCK_STREAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._sock.bind(self.sockaddr)
+            self._sock.listen()
+            self._thread = threading.Thread(target=self._accept, daemon=True)
+            self._thread.start()
+            self.connected = True
+            print(f"SOCKET_TRANSPORT [Listening on {address}]")
+
+    def _frame(self, topic, payload, retain):
+        topic = topic.encode()
+        return self._FRAME.pack(len(topic), len(payload), int(retain)) + topic + payload
+
+    def _accept(self):
+        while self._running:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                return  # socket chiuso
+            if self.family == socket.AF_INET:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.settimeout(self.send_timeout)
+            with self._lock:
+                try:
+                    for topic, payload in self._retained.items():
+                        client.sendall(self._frame(topic, payload, True))
+                except OSError:
+                    client.close()
+                    continue
+                self._clients.append(client)
+
+    def publish(self, topic, payload, retain=False):
+        frame = self._frame(topic, payload, False)
+        with self._lock:
+            if retain:
+                if payload:
+                    self._retained[topic] = payload
+                else:
+                    self._retained.pop(topic, None)
+            for client in list(self._clients):
+                try:
+                    client.sendall(frame)
+                except OSError:
+                    # Display lento o chiuso: il suo stream non e' piu' allineato, si riconnettera'
+                    client.close()
+                    self._clients.remove(client)
+        return True
+
+    def subscribe(self, topics, on_message):
+        self._thread = threading.Thread(target=self._receive, args=(set(topics), on_message), daemon=True)
+        self._thread.start()
+
+    def _read_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Socket closed by the publisher")
+            data += chunk
+        return data
+
+    def _receive(self, topics, on_message):
+        while self._running:
+            try:
+                self._sock = socket.socket(self.family, socket.SOCK_STREAM)
+                self._sock.connect(self.sockaddr)
+                if self.family == socket.AF_INET:
+                    self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.connected = True
+                print(f"SOCKET_TRANSPORT [Connected to {self.sockaddr}]")
+                while self._running:
+                    topic_len, payload_len, retain = self._FRAME.unpack(self._read_exact(self._FRAME.size))
+                    data = self._read_exact(topic_len + payload_len)
+                    topic = data[:topic_len].decode()
+                    if topic in topics:
+                        on_message(topic, data[topic_len:], bool(retain))
+            except OSError:
+                self.connected = False
+                self._sock.close()
+                if self._running:
+                    time.sleep(0.5)  # publisher non avviato o riavviato
+
+    def close(self):
+        self._running = False
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+        if self.role == 'publisher' and self.family == socket.AF_UNIX and os.path.exists(self.sockaddr):
+            os.unlink(self.sockaddr)
+        self.connected = False
+
+
+TRANSPORTS = {
+    'mqtt': MqttTransport,
+    'inproc': InProcessTransport,
+    'shm': SharedMemoryRingTransport,
+    'socket': SocketTransport
+}
+
+
+def create_transport(role, name=config.ALERT_TRANSPORT):
+    """role: 'publisher' or 'subscriber'"""
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown alert transport '{name}', available: {list(TRANSPORTS)}")
+    return TRANSPORTS[name](role)
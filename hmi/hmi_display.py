@@ -1,7 +1,7 @@
 import pygame
+import collections
 import math
-import paho.mqtt.client as mqtt
-import json
+import struct
 import sys
 import os
 import time
@@ -14,6 +14,8 @@ try:
 except ImportError:
     print("HMI_DISPLAY [ERROR: Config not found]")
     sys.exit(1)
+from hmi.alert_codec import decode_alerts
+from hmi.alert_transport import create_transport
 
 
 SCREEN_WIDTH = 420
@@ -31,70 +33,89 @@ TEXT_BG_COLOR = (0, 0, 0, 160)  # Sfondo semi-trasparente per leggibilità
 
 CAR_ICON_PATH = os.path.join(project_root, "hmi", "car-top.png")
 
-radar_data = {
-    'left': {'state': 'SAFE', 'label': '', 'dist': float('inf'), 'ttc': float('inf'), 'last_seen': 0.0},
-    'rear': {'state': 'SAFE', 'label': '', 'dist': float('inf'), 'ttc': float('inf'), 'last_seen': 0.0},
-    'right': {'state': 'SAFE', 'label': '', 'dist': float('inf'), 'ttc': float('inf'), 'last_seen': 0.0}
+FPS = 60  # solo le zone cambiate vengono ridisegnate, i frame senza cambi costano un tick
+SECTOR_RADIUS = 180
+LABEL_RADIUS = 130
+STATE_COLORS = {'SAFE': COLOR_SAFE, 'WARNING': COLOR_WARNING, 'DANGER': COLOR_DANGER}
+
+
+def _zone_sector(zone):
+    # Yaw CARLA (orario, 180 = dietro) -> angolo sullo schermo (antiorario, 270 = in basso)
+    center = (450.0 - zone['transform'].rotation.yaw) % 360.0
+    half_fov = float(zone['fov']) / 2.0
+    return center - half_fov, center + half_fov
+
+
+# Un settore per ogni zona mostrata (config.HMI_ZONES) del registro (config.RCTA_ZONE_DEFINITIONS)
+ZONE_SECTORS = {
+    zone['name']: _zone_sector(zone) for zone in config.RCTA_ZONE_DEFINITIONS if zone['name'] in config.HMI_ZONES
 }
 
-ZONE_TIMEOUT_SEC = 1.0
+# Topic retained di stato delle sole zone mostrate
+ZONE_TOPICS = {config.MQTT_TOPIC_ZONE_STATE.format(zone=zone): zone for zone in ZONE_SECTORS}
+
+def _safe_state():
+    return {'state': 'SAFE', 'label': '', 'dist': float('inf'), 'ttc': float('inf'), 'last_seen': 0.0}
 
-def _on_connect(client, userdata, flags, reason_code, propertie):
-    if reason_code == 0:
-        print(f"HMI_DISPLAY [Connected to the broker {config.MQTT_BROKER}]")
-        client.subscribe(config.MQTT_TOPIC_ALERTS)
-        print(f"HMI_DISPLAY [Subscribed at the topic'{config.MQTT_TOPIC_ALERTS}]'")
-    else:
-        print(f"HMI_DISPLAY [Connection failed {reason_code}]")
 
-def _on_message(client, userdata, msg):
-    global radar_data
+radar_data = {zone: _safe_state() for zone in ZONE_SECTORS}
+
+# Il publisher manda un heartbeat ogni config.MQTT_HEARTBEAT_SEC: il timeout copre solo la perdita del link
+ZONE_TIMEOUT_SEC = 1.0
+
+# Timestamp di invio dei messaggi ricevuti e non ancora a schermo (latenza alert -> pixel)
+_pending_sent = collections.deque()
+
+def _zone_state(objects, current_time):
+    """State shown for a zone from its alerts"""
+    state = _safe_state()
+    for obj in objects:
+        level = obj.get("alert_level")
+        label = obj.get("class", "???").upper()
+        dist = obj.get("distance", float('inf'))
+        ttc = obj.get("ttc", float('inf'))
+
+        zone_state = {'label': label, 'dist': dist, 'ttc': ttc, 'last_seen': current_time}
+
+        # Priorità: Danger > Warning > (più vicino)
+        if level == "danger":
+            if state['state'] != 'DANGER' or dist < state['dist']:
+                state = {'state': 'DANGER', **zone_state}
+
+        elif level == "warning" and state['state'] != 'DANGER':
+            if dist < state['dist']:
+                state = {'state': 'WARNING', **zone_state}
+    return state
+
+def _on_message(topic, payload, retain):
+    zone = ZONE_TOPICS.get(topic)
+    if zone is None:
+        return
     try:
-        payload = msg.payload.decode()
-        data = json.loads(payload)
+        if not payload:
+            # Stato retained cancellato dal publisher allo shutdown
+            radar_data[zone] = _safe_state()
+            return
+
+        # JSON o binario, riconosciuto dal primo byte
+        data = decode_alerts(payload)
 
         current_time = time.time()
+        if retain and current_time - data.get("timestamp", 0.0) > ZONE_TIMEOUT_SEC:
+            # Stato retained di un publisher che non aggiorna piu'
+            return
+
+        radar_data[zone] = _zone_state(data.get("objects", []), current_time)
+        if not retain:
+            _pending_sent.append(data.get("timestamp", current_time))
 
-        if data.get("alert") is True:
-            for obj in data.get("objects", []):
-                zone = obj.get("zone")
-                if zone not in radar_data:
-                    continue
-
-                level = obj.get("alert_level")
-                label = obj.get("class", "???").upper()
-                dist = obj.get("distance", float('inf'))
-                ttc = obj.get("ttc", float('inf'))
-
-                current_state = radar_data[zone]['state']
-
-                # Priorità: Danger > Warning > (più vicino)
-                if level == "danger":
-                    radar_data[zone] = {
-                        'state': 'DANGER',
-                        'label': label,
-                        'dist': dist,
-                        'ttc': ttc,
-                        'last_seen': current_time
-                    }
-
-                elif level == "warning" and current_state != 'DANGER':
-                    # Applica WARNING solo se non è DANGER e se è l'oggetto più vicino
-                    if dist < radar_data[zone]['dist']:
-                        radar_data[zone] = {
-                            'state': 'WARNING',
-                            'label': label,
-                            'dist': dist,
-                            'ttc': ttc,
-                            'last_seen': current_time
-                        }
-
-    except json.JSONDecodeError:
-        print(f"HMI_GRAPHICS [Invalid JSON: {msg.payload}]")
+    except (ValueError, struct.error):
+        print(f"HMI_GRAPHICS [Invalid alert payload: {payload}]")
     except Exception as e:
         print(f"HMI_GRAPHICS [Error processing message: {e}]")
 
-def draw_sector(surface, center, start_angle, end_angle, radius, color):
+def render_sector(center, start_angle, end_angle, radius, color):
+    """Sprite of a sector cropped to its bounding box: (surface, screen rect)"""
     points = [center]
     steps = 30
     for i in range(steps + 1):
@@ -103,73 +124,97 @@ def draw_sector(surface, center, start_angle, end_angle, radius, color):
         y = center[1] - radius * math.sin(angle)
         points.append((x, y))
 
-    sector_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    pygame.draw.polygon(sector_surf, color, points)
-    surface.blit(sector_surf, (0, 0))
-
-def draw_labels(surface, center, sectors_config, font_class, font_data):
-    for side, data in sectors_config.items():
-        if data['state'] == 'SAFE':
-            continue
-
-        # Posizione del testo
-        mid_angle_rad = math.radians((data['start'] + data['end']) / 2)
-        text_radius = 130
-
-        x = center[0] + text_radius * math.cos(mid_angle_rad)
-        y = center[1] - text_radius * math.sin(mid_angle_rad)
-
-        # Prepara stringhe
-        label_str = data['label']
-        dist_str = f"{data['dist']:.1f}m" if data['dist'] != float('inf') else ""
-        ttc_str = f"{data['ttc']:.1f}s" if data['ttc'] != float('inf') else ""
-
-        data_str = f"{dist_str} | {ttc_str}" if dist_str and ttc_str else (dist_str or ttc_str)
-
-        # Renderizza testi
-        surf_class = font_class.render(label_str, True, TEXT_COLOR)
-        data_color = TEXT_DANGER_COLOR if data['state'] == 'DANGER' else TEXT_COLOR
-        surf_data = font_data.render(data_str, True, data_color)
-
-        # Layout
-        rect_class = surf_class.get_rect(center=(x, y - 12))
-        rect_data = surf_data.get_rect(center=(x, y + 12))
-
-        # Sfondo
-        bg_rect = rect_class.union(rect_data).inflate(12, 10)
-        s = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
-        s.fill(TEXT_BG_COLOR)
-        surface.blit(s, bg_rect.topleft)
-
-        # Disegna testi
-        surface.blit(surf_class, rect_class)
-        surface.blit(surf_data, rect_data)
+    left = math.floor(min(x for x, _ in points))
+    top = math.floor(min(y for _, y in points))
+    right = math.ceil(max(x for x, _ in points))
+    bottom = math.ceil(max(y for _, y in points))
+    rect = pygame.Rect(left, top, right - left + 1, bottom - top + 1)
+
+    sprite = pygame.Surface(rect.size, pygame.SRCALPHA)
+    pygame.draw.polygon(sprite, color, [(x - left, y - top) for x, y in points])
+    return sprite.convert_alpha(), rect
+
+def build_sector_sprites(center):
+    """One pre-rendered sprite per (zone, state), drawn once at startup"""
+    return {
+        (zone, state): render_sector(center, start, end, SECTOR_RADIUS, color)
+        for zone, (start, end) in ZONE_SECTORS.items()
+        for state, color in STATE_COLORS.items()
+    }
+
+class TextCache:
+    """Rendered text and label background surfaces, reused while the shown values do not change"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._texts = {}
+        self._backgrounds = {}
+
+    def text(self, font, text, color):
+        key = (id(font), text, color)
+        surface = self._texts.get(key)
+        if surface is None:
+            if len(self._texts) >= self.max_entries:
+                self._texts.clear()  # distanze e TTC sempre diversi: niente crescita illimitata
+            surface = self._texts[key] = font.render(text, True, color)
+        return surface
+
+    def background(self, size):
+        surface = self._backgrounds.get(size)
+        if surface is None:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill(TEXT_BG_COLOR)
+            self._backgrounds[size] = surface
+        return surface
+
+def zone_view(data):
+    """What the HMI shows for a zone: (state, label, dist | ttc text)"""
+    if data['state'] == 'SAFE':
+        return ('SAFE', '', '')
+    dist_str = f"{data['dist']:.1f}m" if data['dist'] != float('inf') else ""
+    ttc_str = f"{data['ttc']:.1f}s" if data['ttc'] != float('inf') else ""
+    data_str = f"{dist_str} | {ttc_str}" if dist_str and ttc_str else (dist_str or ttc_str)
+    return (data['state'], data['label'], data_str)
+
+def layout_label(anchor, view, text_cache, font_class, font_data):
+    """Blits of a zone label, background first, and the rect they cover (None for SAFE)"""
+    state, label_str, data_str = view
+    if state == 'SAFE':
+        return [], None
+    x, y = anchor
+
+    surf_class = text_cache.text(font_class, label_str, TEXT_COLOR)
+    data_color = TEXT_DANGER_COLOR if state == 'DANGER' else TEXT_COLOR
+    surf_data = text_cache.text(font_data, data_str, data_color)
+
+    # Layout
+    rect_class = surf_class.get_rect(center=(x, y - 12))
+    rect_data = surf_data.get_rect(center=(x, y + 12))
+
+    # Sfondo
+    bg_rect = rect_class.union(rect_data).inflate(12, 10)
+    blits = [(text_cache.background(bg_rect.size), bg_rect), (surf_class, rect_class), (surf_data, rect_data)]
+    return blits, bg_rect
 
 def check_zone_timeouts():
     current_time = time.time()
     for zone in radar_data:
         if radar_data[zone]['state'] != 'SAFE':
             if current_time - radar_data[zone]['last_seen'] > ZONE_TIMEOUT_SEC:
-                radar_data[zone] = {
-                    'state': 'SAFE',
-                    'label': '',
-                    'dist': float('inf'),
-                    'ttc': float('inf'),
-                    'last_seen': 0.0
-                }
-
-def main():
+                radar_data[zone] = _safe_state()
+
+def main(transport=None):
     global radar_data, last_update
 
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-    client.on_connect = _on_connect
-    client.on_message = _on_message
+    # Trasporto di config.ALERT_TRANSPORT (MQTT di default), o uno gia' creato dal chiamante
     try:
-        client.connect(config.MQTT_BROKER, config.MQTT_PORT, 60)
-        client.loop_start()
+        if transport is None:
+            transport = create_transport('subscriber')
+        transport.subscribe(list(ZONE_TOPICS), _on_message)
     except Exception as e:
-        print(f"HMI_GRAPHICS [MQTT Error: {e}]")
+        print(f"HMI_GRAPHICS [Transport Error: {e}]")
         return
+    latencies = []
 
     # --- Setup Pygame e FONT ---
     pygame.init()
@@ -192,42 +237,82 @@ def main():
     cx = SCREEN_WIDTH // 2
     cy = SCREEN_HEIGHT // 2 + 20
 
+    # Settori pre-renderizzati e posizione delle etichette di ogni zona
+    sector_sprites = build_sector_sprites((cx, cy))
+    label_anchors = {}
+    for zone, (start, end) in ZONE_SECTORS.items():
+        mid_angle_rad = math.radians((start + end) / 2)
+        label_anchors[zone] = (cx + LABEL_RADIUS * math.cos(mid_angle_rad), cy - LABEL_RADIUS * math.sin(mid_angle_rad))
+    car_rect = car_img.get_rect(center=(cx, cy - 60)) if car_img is not None else None
+    text_cache = TextCache()
+
+    shown = {}  # zone -> view a schermo
+    labels = {}  # zone -> (blits, rect)
+    full_redraw = True
+    redraws = 0
+    redraw_time = 0.0
+
     running = True
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWRESTORED):
+                full_redraw = True
 
         check_zone_timeouts()
 
-        screen.fill(BG_COLOR)
-
-        sectors_config = {
-            'left': {'start': 180, 'end': 240, **radar_data['left']},
-            'rear': {'start': 240, 'end': 300, **radar_data['rear']},
-            'right': {'start': 300, 'end': 360, **radar_data['right']}
-        }
-
-        # --- Disegno Settori ---
-        for side, data in sectors_config.items():
-            state = data['state']
-            color = COLOR_SAFE
-            if state == 'WARNING':
-                color = COLOR_WARNING
-            elif state == 'DANGER':
-                color = COLOR_DANGER
-            draw_sector(screen, (cx, cy), data['start'], data['end'], 180, color)
-
-        img_rect = car_img.get_rect(center=(cx, cy-60))
-        screen.blit(car_img, img_rect)
-        draw_labels(screen, (cx, cy), sectors_config, font_class, font_data)
-
-        pygame.display.flip()
-        clock.tick(40)
-
-    client.loop_stop()
-    client.disconnect()
+        views = {zone: zone_view(radar_data[zone]) for zone in ZONE_SECTORS}
+        changed = [zone for zone, view in views.items() if full_redraw or view != shown.get(zone)]
+
+        if changed:
+            t0 = time.perf_counter()
+            # Area sporca: settori cambiati e vecchie/nuove etichette
+            dirty = []
+            for zone in changed:
+                dirty.append(sector_sprites[(zone, views[zone][0])][1])
+                old_rect = labels.get(zone, ([], None))[1]
+                if old_rect is not None:
+                    dirty.append(old_rect)
+                labels[zone] = layout_label(label_anchors[zone], views[zone], text_cache, font_class, font_data)
+                if labels[zone][1] is not None:
+                    dirty.append(labels[zone][1])
+            dirty_rect = screen.get_rect() if full_redraw else dirty[0].unionall(dirty[1:])
+
+            # Ridisegno completo ma ritagliato all'area sporca (i settori si sovrappongono)
+            screen.set_clip(dirty_rect)
+            screen.fill(BG_COLOR)
+            for zone, view in views.items():
+                sprite, rect = sector_sprites[(zone, view[0])]
+                screen.blit(sprite, rect)
+            if car_img is not None:
+                screen.blit(car_img, car_rect)
+            for blits, _ in labels.values():
+                for surface, rect in blits:
+                    screen.blit(surface, rect)
+            screen.set_clip(None)
+
+            pygame.display.update(dirty_rect)
+            shown = views
+            full_redraw = False
+            redraws += 1
+            redraw_time += time.perf_counter() - t0
+
+        if _pending_sent:
+            # A schermo: o appena ridisegnato o gia' uguale (heartbeat)
+            flip_time = time.time()
+            while _pending_sent:
+                latencies.append(flip_time - _pending_sent.popleft())
+        clock.tick(FPS)
+
+    transport.close()
     pygame.quit()
+    if latencies:
+        latencies.sort()
+        print(f"HMI_GRAPHICS [Alert to pixel latency: mean {sum(latencies) / len(latencies) * 1e3:.1f} ms, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1e3:.1f} ms over {len(latencies)} messages]")
+    if redraws:
+        print(f"HMI_GRAPHICS [Redraws: {redraws}, mean {redraw_time / redraws * 1e3:.2f} ms]")
     print("HMI_GRAPHICS [Shutdown complete]")
 
 
@@ -1,5 +1,5 @@
-import paho.mqtt.client as mqtt
-import json
+import math
+import threading
 import time
 import sys
 import os
@@ -14,71 +14,115 @@ try:
 except ImportError:
     print("MQTT_PUBLISHER [ERROR: Config not found, using defaults]")
 
+from hmi.alert_codec import encode_alerts
+from hmi.alert_transport import create_transport
+
 
 class MQTTPublisher:
-    def __init__(self):
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-        self.client.on_connect = self._on_connect
-        self.client.on_disconnect = self._on_disconnect
+    """
+    Alert publisher of the RCTA pipeline. The messages go through the
+    transport selected by config.ALERT_TRANSPORT (MQTT broker by default,
+    see hmi/alert_transport.py), topics and payloads are the same for all.
+    """
 
-        self.connected = False
-        self.broker = config.MQTT_BROKER
-        self.port = config.MQTT_PORT
+    def __init__(self, transport=None):
+        self.transport = transport if transport is not None else create_transport('publisher')
         self.topic = config.MQTT_TOPIC_ALERTS
+        # Stato corrente di ogni zona su un topic retained: un display lo riceve appena si iscrive
+        self.zone_topics = {zone: config.MQTT_TOPIC_ZONE_STATE.format(zone=zone) for zone in config.RCTA_ZONES}
+        self.alert_format = config.MQTT_ALERT_FORMAT
 
-        # Try to connect
-        try:
-            self.client.connect(self.broker, self.port, 60)
-            self.client.loop_start()  # Start background thread
-            print(f"MQTT_PUBLISHER [Connecting to {self.broker}:{self.port}...]")
-        except Exception as e:
-            print(f"MQTT_PUBLISHER [ERROR: Could not connect to broker: {e}]")
+        # Coalescing: le zone riportano, flush() pubblica al piu' un messaggio per tick
+        self.min_interval = 1.0 / config.MQTT_MAX_PUBLISH_RATE_HZ
+        self.heartbeat_sec = config.MQTT_HEARTBEAT_SEC
+        self.zone_stale_sec = config.MQTT_ZONE_STALE_SEC
+        self.dist_step = config.MQTT_DEDUP_DIST_STEP_M
+        self._lock = threading.Lock()
+        self._zone_alerts = {}  # zone -> (dangerous_objects, timestamp)
+        self._zone_states = {}  # zone -> stato pubblicato sul topic retained
+        self._zone_published = {}  # zone -> ultima pubblicazione del topic retained (monotonic)
+        self._last_publish = float('-inf')
+        self.published = 0
+        self.heartbeats = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
 
-    def _on_connect(self, client, userdata, flags, reason_code, properties):
-        if reason_code == 0:
-            self.connected = True
-            print(f"MQTT_PUBLISHER [Connected successfully to {self.broker}]")
-        else:
-            print(f"MQTT_PUBLISHER [Connection failed: {reason_code}]")
+    def report_zone(self, zone, dangerous_objects, timestamp):
+        """Latest alerts of a zone (empty when the zone is clear), sent by the next flush()"""
+        with self._lock:
+            self._zone_alerts[zone] = (list(dangerous_objects), timestamp)
 
-    def _on_disconnect(self, client, userdata, reason_code, properties):
-        self.connected = False
-        print(f"MQTT_PUBLISHER [Disconnected: {reason_code}]")
+    def flush(self, sim_time):
+        """
+        Called once per world tick. When the alert state changed (rate limited
+        to MQTT_MAX_PUBLISH_RATE_HZ) publishes one event with the alerts of all
+        the zones and the retained state of the changed zones. The retained
+        state of every zone is also republished as a heartbeat when older than
+        MQTT_HEARTBEAT_SEC, independently of the other zones.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Zone che non riportano piu' (sistema spento, frame persi): stato clear
+            for zone, (_, timestamp) in list(self._zone_alerts.items()):
+                if sim_time - timestamp > self.zone_stale_sec:
+                    del self._zone_alerts[zone]
+            zone_objects = {
+                zone: self._zone_alerts[zone][0] if zone in self._zone_alerts else []
+                for zone in self.zone_topics
+            }
 
-    def publish_alerts(self, dangerous_objects):
-        if not self.connected:
-            # Not connected, skip publishing (but don't block)
+        zone_states = {zone: self._state_key(objects) for zone, objects in zone_objects.items()}
+        changed = [zone for zone, state in zone_states.items() if state != self._zone_states.get(zone)]
+        # Heartbeat per zona: una zona che cambia di continuo non blocca il refresh delle altre
+        expired = [zone for zone in zone_states if zone not in changed
+                   and now - self._zone_published.get(zone, float('-inf')) >= self.heartbeat_sec]
+        if not changed and not expired:
+            self.deduplicated += 1
             return
-
-        if not dangerous_objects:
-            # No alerts, skip
+        if now - self._last_publish < self.min_interval:
+            # Resta in sospeso fino al prossimo flush consentito
+            self.rate_limited += 1
             return
+        if expired:
+            self.heartbeats += 1
 
-        # Prepare MQTT message
-        message = {
-            "alert": True,
-            "timestamp": time.time(),
-            "objects": dangerous_objects
-        }
+        timestamp = time.time()
+        objects = [obj for zone in self.zone_topics for obj in zone_objects[zone]]
+        if not self._publish(self.topic, objects, timestamp):
+            return
+        self._last_publish = now
+        for zone in changed + expired:
+            if self._publish(self.zone_topics[zone], zone_objects[zone], timestamp, retain=True):
+                self._zone_states[zone] = zone_states[zone]
+                self._zone_published[zone] = now
 
-        # Publish (non-blocking, async)
-        try:
-            result = self.client.publish(
-                self.topic,
-                json.dumps(message),
-                qos=1  # At least once delivery
-            )
+    def _state_key(self, objects):
+        """What the HMI shows: level and class per zone, distance quantized to MQTT_DEDUP_DIST_STEP_M"""
+        return tuple(sorted(
+            (obj['zone'], obj['alert_level'], obj['class'],
+             round(obj['distance'] / self.dist_step) if math.isfinite(obj['distance']) else -1)
+            for obj in objects
+        ))
 
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                pass  # Success, no need to log every message
-            else:
-                print(f"MQTT_PUBLISHER [ERROR: Publish failed with code {result.rc}]")
+    def _publish(self, topic, objects, timestamp, retain=False):
+        # Non-blocking: a transport that cannot send now (broker not connected) returns False
+        if self.transport.publish(topic, encode_alerts(objects, timestamp, self.alert_format), retain):
+            self.published += 1
+            return True
+        return False
 
-        except Exception as e:
-            print(f"MQTT_PUBLISHER [ERROR: {e}]")
+    def get_stats(self):
+        return {
+            'published': self.published,
+            'heartbeats': self.heartbeats,
+            'deduplicated': self.deduplicated,
+            'rate_limited': self.rate_limited
+        }
 
     def disconnect(self):
-        if self.connected:
-            self.client.loop_stop()
-            self.client.disconnect()
-            print("MQTT_PUBLISHER [Disconnected]")
\ No newline at end of file
+        if self.transport.connected:
+            # Un payload vuoto cancella gli stati retained: niente allarmi vecchi per i display che si iscrivono dopo
+            for topic in self.zone_topics.values():
+                self.transport.publish(topic, b'', retain=True)
+        self.transport.close()
+        print("MQTT_PUBLISHER [Disconnected]")
@@ -1,4 +1,5 @@
 import carla
+import config
 import time
 import cv2
 import pygame
@@ -7,7 +8,9 @@ from carla_bridge.carla_manager import CarlaManager
 from carla_bridge.spawner import Spawner
 from carla_bridge.sensor_manager import SensorManager
 from controller.keyboard_controller import KeyboardController
-from rcta_system.rcta_callbacks import sync_and_callback, update_vehicle_state
+from carla_bridge.sensor_rate_controller import SensorRateController
+from rcta_system.rcta_callbacks import (sync_and_callback, update_vehicle_state, advance_clock,
+                                        get_ego_state, highest_alert_level, shutdown as shutdown_rcta)
 from scenarios.parking_lot_scenario import (setup_rcta_base_scenario,
                                             scenario_bicycle,
                                             scenario_pedestrian_adult,
@@ -41,23 +44,20 @@ def main():
 
             print("MAIN [Initializing Sensor manager and cameras]")
             sensor_manager = SensorManager(manager.world, manager.actor_list)
-            (r_rgb, r_depth, l_rgb, l_depth, ri_rgb, ri_depth) = sensor_manager.setup_rcta_cameras(ego_vehicle)
-
-            print("MAIN [Registering RCTA callbacks]")
-            # REAR zone callbacks
-            r_rgb.listen(lambda image: sync_and_callback("rear", "rgb", image))
-            r_depth.listen(lambda image: sync_and_callback("rear", "depth", image))
-            #print("MAIN [REAR callbacks registered]")
-
-            # LEFT zone callbacks
-            l_rgb.listen(lambda image: sync_and_callback("left", "rgb", image))
-            l_depth.listen(lambda image: sync_and_callback("left", "depth", image))
-            #print("MAIN [LEFT callbacks registered]")
-
-            # RIGHT zone callbacks
-            ri_rgb.listen(lambda image: sync_and_callback("right", "rgb", image))
-            ri_depth.listen(lambda image: sync_and_callback("right", "depth", image))
-            #print("MAIN [RIGHT callbacks registered]")
+            rate_controller = None
+            if config.SENSOR_RATE_CONTROL_ENABLED:
+                # Le camere vengono create (e ricreate) dal controller in base a marcia e allarmi
+                rate_controller = SensorRateController(sensor_manager, ego_vehicle, sync_and_callback)
+            else:
+                zone_cameras = sensor_manager.setup_rcta_cameras(ego_vehicle)
+
+                print("MAIN [Registering RCTA callbacks]")
+                for zone, (rgb_cam, depth_cam) in zone_cameras.items():
+                    if rgb_cam is None or depth_cam is None:
+                        continue
+                    rgb_cam.listen(lambda image, zone=zone: sync_and_callback(zone, "rgb", image))
+                    depth_cam.listen(lambda image, zone=zone: sync_and_callback(zone, "depth", image))
+                    #print(f"MAIN [{zone.upper()} callbacks registered]")
 
             #Differents SCENARIOs
             #scenario_vehicle(spawner)
@@ -75,7 +75,9 @@ def main():
                     if event.type == pygame.QUIT:
                         running = False
 
-                manager.world.wait_for_tick()
+                snapshot = manager.world.wait_for_tick()
+                sim_time = snapshot.timestamp.elapsed_seconds
+                advance_clock(sim_time)
 
 
                 # Get keyboard input and apply control
@@ -83,6 +85,9 @@ def main():
                 control = controller.parse_input(keys)
                 ego_vehicle.apply_control(control)
                 update_vehicle_state(ego_vehicle)
+                if rate_controller is not None:
+                    reverse, speed = get_ego_state()
+                    rate_controller.update(reverse, speed, highest_alert_level(sim_time), sim_time)
 
                 # Update spectator camera position
                 ego_transform = ego_vehicle.get_transform()
@@ -99,6 +104,10 @@ def main():
                 # 30 FPS
                 clock.tick(30)
 
+            if rate_controller is not None:
+                print(f"MAIN [Sensor rate stats: {rate_controller.get_stats()}]")
+                rate_controller.stop()
+
     except KeyboardInterrupt:
         print("\nMAIN [Script interrupted from keyboard]")
     except Exception as e:
@@ -106,6 +115,7 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        shutdown_rcta()
         pygame.quit()
         cv2.destroyAllWindows()
         print("MAIN [Cleanup completed]")
@@ -0,0 +1,143 @@
+import threading
+import numpy as np
+import config
+from rcta_system.depth_roi import _roi_distances
+
+
+class BoxPropagator:
+    """
+    Detect-and-propagate: YOLO runs only on keyframes, in between the boxes of
+    the last keyframe are moved forward with a constant image-velocity and
+    range-rate model, and their distance is measured again on the new depth.
+    When the measured distance disagrees with the prediction the box has
+    drifted off the object and a keyframe is requested.
+    """
+
+    def __init__(self, zones, roi_method, roi_max_samples, percentile,
+                 keyframe_interval=config.PROPAGATION_KEYFRAME_INTERVAL,
+                 max_rel_error=config.PROPAGATION_MAX_REL_ERROR,
+                 min_confidence=config.PROPAGATION_MIN_CONFIDENCE):
+        self.roi_method = roi_method
+        self.roi_max_samples = roi_max_samples
+        self.percentile = percentile
+        self.keyframe_interval = keyframe_interval
+        self.max_rel_error = max_rel_error
+        self.min_confidence = min_confidence
+
+        self._lock = threading.Lock()
+        # zone -> {track_id: keyframe state}
+        self._tracks = {zone: {} for zone in zones}
+        self._frames_since_keyframe = {zone: 0 for zone in zones}
+        self._force_keyframe = {zone: True for zone in zones}
+        self._stats = {zone: {'keyframes': 0, 'propagated': 0, 'rejected': 0} for zone in zones}
+
+        print(f"BOX_PROPAGATOR [Initialized: keyframe every {keyframe_interval} frames]")
+
+    def needs_keyframe(self, zone):
+        with self._lock:
+            return (self._force_keyframe[zone]
+                    or not self._tracks[zone]
+                    or self._frames_since_keyframe[zone] + 1 >= self.keyframe_interval)
+
+    def update_keyframe(self, zone, fused_objects, timestamp):
+        with self._lock:
+            previous = self._tracks[zone]
+            tracks = {}
+
+            for obj in fused_objects:
+                x1, y1, x2, y2 = obj['bbox']
+                center = np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0])
+                size = np.array([x2 - x1, y2 - y1], dtype=float)
+                velocity = np.zeros(2)
+                range_rate = 0.0
+
+                prev = previous.get(obj['id'])
+                if prev is not None and timestamp > prev['time']:
+                    dt = timestamp - prev['time']
+                    velocity = (center - prev['center']) / dt
+                    if np.isfinite(obj['depth']) and np.isfinite(prev['depth']):
+                        range_rate = (obj['depth'] - prev['depth']) / dt
+
+                tracks[obj['id']] = {
+                    'class': obj['class'],
+                    'confidence': obj['confidence'],
+                    'center': center,
+                    'size': size,
+                    'depth': obj['depth'],
+                    'time': timestamp,
+                    'velocity': velocity,
+                    'range_rate': range_rate
+                }
+
+            self._tracks[zone] = tracks
+            self._frames_since_keyframe[zone] = 0
+            self._force_keyframe[zone] = False
+            self._stats[zone]['keyframes'] += 1
+
+    def propagate(self, zone, depth_raw, timestamp, depth_scale=1.0):
+        """
+        Fused objects predicted for this frame, or None if the propagation is
+        not reliable and the frame must go through the detector.
+        depth_scale: depth width / rgb width, boxes stay in rgb coordinates.
+        """
+        with self._lock:
+            tracks = list(self._tracks[zone].items())
+
+        if not tracks:
+            return None
+
+        h = depth_raw.shape[0] / depth_scale
+        w = depth_raw.shape[1] / depth_scale
+        dt = np.array([timestamp - state['time'] for _, state in tracks])
+        centers = np.array([state['center'] for _, state in tracks])
+        sizes = np.array([state['size'] for _, state in tracks])
+        velocities = np.array([state['velocity'] for _, state in tracks])
+        kf_dist = np.array([state['depth'] for _, state in tracks])
+        range_rates = np.array([state['range_rate'] for _, state in tracks])
+
+        # Moto costante dall'ultimo keyframe (nessun accumulo di deriva)
+        pred_dist = np.maximum(kf_dist + range_rates * dt, 0.1)
+        with np.errstate(invalid='ignore'):
+            scale = np.where(np.isfinite(kf_dist), kf_dist / pred_dist, 1.0)
+        pred_centers = centers + velocities * dt[:, None]
+        half = sizes * scale[:, None] / 2.0
+
+        boxes = np.empty((len(tracks), 4), dtype=np.int64)
+        boxes[:, 0] = np.clip(pred_centers[:, 0] - half[:, 0], 0, w)
+        boxes[:, 1] = np.clip(pred_centers[:, 1] - half[:, 1], 0, h)
+        boxes[:, 2] = np.clip(pred_centers[:, 0] + half[:, 0], 0, w)
+        boxes[:, 3] = np.clip(pred_centers[:, 1] + half[:, 1], 0, h)
+
+        measured = _roi_distances(depth_raw, boxes, self.percentile, self.roi_method, self.roi_max_samples,
+                                  depth_scale)
+        with np.errstate(invalid='ignore'):
+            rel_error = np.abs(measured - pred_dist) / pred_dist
+        rel_error[~np.isfinite(rel_error)] = np.inf
+        confidence = np.clip(1.0 - rel_error / self.max_rel_error, 0.0, 1.0)
+
+        with self._lock:
+            if confidence.min() < self.min_confidence:
+                # Box finito fuori dall'oggetto: questo frame passa da YOLO
+                self._force_keyframe[zone] = True
+                self._stats[zone]['rejected'] += 1
+                return None
+            self._frames_since_keyframe[zone] += 1
+            self._stats[zone]['propagated'] += 1
+
+        fused = []
+        for (track_id, state), box, dist, conf in zip(tracks, boxes, measured, confidence):
+            fused.append({
+                'id': track_id,
+                'class': state['class'],
+                'confidence': float(state['confidence'] * conf),
+                'bbox': box.tolist(),
+                'depth': float(dist),
+                'dist': float(dist),  # planar, Perception converts it to range
+                'ttc_obj': float('inf'),  # Will be calculated in tracking
+                'propagated': True
+            })
+        return fused
+
+    def get_stats(self):
+        with self._lock:
+            return {zone: dict(stats) for zone, stats in self._stats.items()}
@@ -0,0 +1,70 @@
+import numpy as np
+import config
+
+
+def rotation_matrix(rotation):
+    """Rotation of a carla.Rotation (degrees), same matrix as carla.Transform"""
+    cy, sy = np.cos(np.radians(rotation.yaw)), np.sin(np.radians(rotation.yaw))
+    cr, sr = np.cos(np.radians(rotation.roll)), np.sin(np.radians(rotation.roll))
+    cp, sp = np.cos(np.radians(rotation.pitch)), np.sin(np.radians(rotation.pitch))
+    return np.array([
+        [cp * cy, cy * sp * sr - sy * cr, -cy * sp * cr - sy * sr],
+        [cp * sy, sy * sp * sr + cy * cr, -sy * sp * cr + cy * sr],
+        [sp, -cp * sr, cp * cr]
+    ])
+
+
+class CameraRays:
+    """
+    Per-pixel ray lookup tables of one camera, built once from resolution,
+    FOV and mount transform. CARLA depth is planar (along the optical axis):
+    planar depth * range_scale is the Euclidean range, planar depth * rays
+    + origin is the point in the ego frame (x forward, y right, z up).
+    """
+
+    def __init__(self, transform,
+                 width=config.CAMERA_IMAGE_WIDTH,
+                 height=config.CAMERA_IMAGE_HEIGHT,
+                 fov_deg=float(config.CAMERA_FOV)):
+        self.width = width
+        self.height = height
+        self.half_fov = np.radians(fov_deg) / 2.0
+        self.yaw = np.radians(transform.rotation.yaw)
+        self.origin = np.array([transform.location.x, transform.location.y, transform.location.z])
+
+        focal = width / (2.0 * np.tan(self.half_fov))
+        u = (np.arange(width) + 0.5 - width / 2.0) / focal
+        v = (np.arange(height) + 0.5 - height / 2.0) / focal
+        uu, vv = np.meshgrid(u, v)
+
+        # Camera frame (x avanti, y destra, z su) per unita' di depth planare
+        rays_camera = np.stack([np.ones_like(uu), uu, -vv], axis=-1)
+        self.range_scale = np.sqrt(1.0 + uu ** 2 + vv ** 2).astype(np.float32)
+        self.rays = (rays_camera @ rotation_matrix(transform.rotation).T).astype(np.float32)
+
+    def localize(self, boxes, depths):
+        """
+        Range and ego point of each box from its planar depth, on the ray
+        through the box center. Returns ((N,) ranges, (N, 3) points).
+        """
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        depths = np.asarray(depths, dtype=np.float64)
+        cols = np.clip((boxes[:, 0] + boxes[:, 2]) // 2, 0, self.width - 1).astype(np.int64)
+        rows = np.clip((boxes[:, 1] + boxes[:, 3]) // 2, 0, self.height - 1).astype(np.int64)
+        ranges = depths * self.range_scale[rows, cols]
+        points = self.origin + depths[:, None] * self.rays[rows, cols]
+        return ranges, points
+
+    def sees(self, points):
+        """True for the ego points inside the horizontal FOV of this camera"""
+        bearing = np.arctan2(points[:, 1] - self.origin[1], points[:, 0] - self.origin[0])
+        off_axis = np.angle(np.exp(1j * (bearing - self.yaw)))
+        return np.abs(off_axis) <= self.half_fov
+
+
+def build_camera_rays(zone_definitions=config.RCTA_ZONE_DEFINITIONS):
+    return {
+        # Tabelle nelle coordinate dell'immagine RGB, quelle dei box
+        zone['name']: CameraRays(zone['transform'], zone['rgb']['width'], zone['rgb']['height'], float(zone['fov']))
+        for zone in zone_definitions
+    }
@@ -1,3 +1,4 @@
+import numpy as np
 import config
 
 
@@ -9,7 +10,8 @@ class DecisionMaker:
         print(
             f"DECISION_MAKER-{zone_name.upper()} [Initialized with TTC={self.ttc_threshold}s, DIST={self.dist_threshold}m]")
 
-    def evaluate(self, fused_objects):
+    def evaluate(self, fused_objects, ego_motion=None):
+        # ego_motion non usato: stessa firma di CpaThreatEvaluator
         if not fused_objects:
             return []
 
@@ -48,4 +50,130 @@ class DecisionMaker:
                 "ttc": min_dist_obj['ttc_obj']
             })
 
-        return dangerous_objects_list
\ No newline at end of file
+        return dangerous_objects_list
+
+class CpaThreatEvaluator:
+    """
+    Alerts only for objects whose predicted path meets the ego vehicle.
+    The ego follows a constant speed / constant steering arc, every object a
+    straight line at its ego-frame velocity; the closest point of approach to
+    the ego footprint is computed for all the objects at once on a time grid.
+    """
+
+    def __init__(self, zone_name,
+                 horizon_sec=config.CPA_HORIZON_SEC,
+                 time_step_sec=config.CPA_TIME_STEP_SEC,
+                 margin_m=config.CPA_MARGIN_M):
+        self.zone_name = zone_name
+        self.ttc_threshold = config.TTC_THRESHOLD
+        self.dist_threshold = config.DIST_THRESHOLD
+        self.margin_m = margin_m
+        self.half_length = config.EGO_HALF_LENGTH_M
+        self.half_width = config.EGO_HALF_WIDTH_M
+        self.times = np.arange(0.0, horizon_sec + 1e-9, time_step_sec)
+        print(f"CPA_EVALUATOR-{zone_name.upper()} [Initialized with horizon={horizon_sec}s, margin={margin_m}m]")
+
+    def predict_ego_path(self, speed, steer):
+        """speed: signed longitudinal speed (m/s), steer: control.steer in [-1, 1]"""
+        wheel_angle = np.radians(steer * config.EGO_MAX_STEER_DEG)
+        yaw_rate = speed * np.tan(wheel_angle) / config.EGO_WHEELBASE_M
+        # Arco a raggio costante (x avanti, y destra, yaw orario come CARLA)
+        t = self.times
+        yaw = yaw_rate * t
+        if abs(yaw_rate) > 1e-6:
+            radius = speed / yaw_rate
+            x = radius * np.sin(yaw)
+            y = radius * (1.0 - np.cos(yaw))
+        else:
+            x = speed * t
+            y = np.zeros_like(t)
+        return x, y, yaw
+
+    def closest_approach(self, positions, velocities, ego_speed, ego_path):
+        """
+        positions, velocities: (N, 2) ego-frame points and relative velocities,
+        ego_path: predict_ego_path output for the same ego_speed.
+        Returns (N,) time of first contact with the ego footprint + margin
+        (inf if none within the horizon) and (N,) minimum distance to it.
+        """
+        ego_x, ego_y, ego_yaw = ego_path
+        t = self.times[None, :]
+        # Velocita' nel mondo = relativa + ego (la rotazione dell'ego e' nel percorso predetto)
+        abs_vx = velocities[:, 0:1] + ego_speed
+        abs_vy = velocities[:, 1:2]
+
+        dx = positions[:, 0:1] + abs_vx * t - ego_x[None, :]
+        dy = positions[:, 1:2] + abs_vy * t - ego_y[None, :]
+        cos_yaw, sin_yaw = np.cos(ego_yaw)[None, :], np.sin(ego_yaw)[None, :]
+        # Posizione relativa nel frame dell'ego al tempo t
+        local_x = dx * cos_yaw + dy * sin_yaw
+        local_y = -dx * sin_yaw + dy * cos_yaw
+
+        out_x = np.maximum(np.abs(local_x) - self.half_length, 0.0)
+        out_y = np.maximum(np.abs(local_y) - self.half_width, 0.0)
+        gap = np.hypot(out_x, out_y)  # (N, T) distanza dalla sagoma
+
+        min_gap = gap.min(axis=1)
+        contact = gap <= self.margin_m
+        first = contact.argmax(axis=1)
+        t_contact = np.where(contact.any(axis=1), self.times[first], np.inf)
+        return t_contact, min_gap
+
+    def evaluate(self, fused_objects, ego_motion=(0.0, 0.0)):
+        """
+        Same output as DecisionMaker.evaluate: danger / warning for predicted
+        path intersections, warning for an object closer than DIST_THRESHOLD.
+        ego_motion: (signed speed m/s, steer) snapshot taken by the caller,
+        the evaluator keeps no ego state between calls.
+        """
+        if not fused_objects:
+            return []
+
+        located = [obj for obj in fused_objects if obj.get('ego_xyz') is not None]
+        if located:
+            ego_speed, steer = ego_motion
+            ego_path = self.predict_ego_path(ego_speed, steer)
+            positions = np.array([obj['ego_xyz'][:2] for obj in located], dtype=np.float64)
+            velocities = np.array([self._relative_velocity(obj, p, ego_speed) for obj, p in zip(located, positions)],
+                                  dtype=np.float64)
+            valid = np.isfinite(positions).all(axis=1)
+
+            t_contact, _ = self.closest_approach(np.where(valid[:, None], positions, 1e6), velocities,
+                                                 ego_speed, ego_path)
+            if np.isfinite(t_contact).any():
+                i = int(t_contact.argmin())
+                obj = located[i]
+                alert_level = "danger" if t_contact[i] < self.ttc_threshold else "warning"
+                return [{
+                    "zone": self.zone_name,
+                    "alert_level": alert_level,
+                    "class": obj['class'],
+                    "distance": obj['dist'],
+                    "ttc": float(t_contact[i])
+                }]
+
+        # Nessuna intersezione prevista: resta l'allarme di prossimita' come in DecisionMaker
+        min_dist_obj = min(fused_objects, key=lambda obj: obj.get('dist', float('inf')))
+        if min_dist_obj['dist'] < self.dist_threshold:
+            return [{
+                "zone": self.zone_name,
+                "alert_level": "warning",
+                "class": min_dist_obj['class'],
+                "distance": min_dist_obj['dist'],
+                "ttc": min_dist_obj.get('ttc_obj', float('inf'))
+            }]
+        return []
+
+    @staticmethod
+    def _relative_velocity(obj, position, ego_speed):
+        """Ego-frame relative velocity of one object (m/s)"""
+        if obj.get('ego_vel') is not None:
+            return obj['ego_vel']
+        # Senza EgoTracker: velocita' radiale dal TTC della TrackTable (dist / ttc)
+        ttc = obj.get('ttc_obj', float('inf'))
+        norm = np.hypot(position[0], position[1])
+        if np.isfinite(ttc) and ttc > 0 and norm > 1e-6:
+            closing = obj['dist'] / ttc
+            return -closing * position[0] / norm, -closing * position[1] / norm
+        # Track nuovo o non in avvicinamento: fermo nel mondo
+        return -ego_speed, 0.0
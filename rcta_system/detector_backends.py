@@ -0,0 +1,264 @@
+"""
+Inference backends for ObjectDetector.
+Every backend returns, for each input image, an array (N, 6) with
+[x1, y1, x2, y2, confidence, class] in the coordinates of the original image.
+"""
+import numpy as np
+import cv2
+
+COCO_CLASS_NAMES = {
+    0: 'person', 1: 'bicycle', 2: 'car', 3: 'motorcycle', 4: 'airplane', 5: 'bus',
+    6: 'train', 7: 'truck', 8: 'boat', 9: 'traffic light', 10: 'fire hydrant',
+    11: 'stop sign', 12: 'parking meter', 13: 'bench', 14: 'bird', 15: 'cat', 16: 'dog',
+    17: 'horse', 18: 'sheep', 19: 'cow', 20: 'elephant', 21: 'bear', 22: 'zebra',
+    23: 'giraffe', 24: 'backpack', 25: 'umbrella', 26: 'handbag', 27: 'tie',
+    28: 'suitcase', 29: 'frisbee', 30: 'skis', 31: 'snowboard', 32: 'sports ball',
+    33: 'kite', 34: 'baseball bat', 35: 'baseball glove', 36: 'skateboard',
+    37: 'surfboard', 38: 'tennis racket', 39: 'bottle', 40: 'wine glass', 41: 'cup',
+    42: 'fork', 43: 'knife', 44: 'spoon', 45: 'bowl', 46: 'banana', 47: 'apple',
+    48: 'sandwich', 49: 'orange', 50: 'broccoli', 51: 'carrot', 52: 'hot dog',
+    53: 'pizza', 54: 'donut', 55: 'cake', 56: 'chair', 57: 'couch', 58: 'potted plant',
+    59: 'bed', 60: 'dining table', 61: 'toilet', 62: 'tv', 63: 'laptop', 64: 'mouse',
+    65: 'remote', 66: 'keyboard', 67: 'cell phone', 68: 'microwave', 69: 'oven',
+    70: 'toaster', 71: 'sink', 72: 'refrigerator', 73: 'book', 74: 'clock', 75: 'vase',
+    76: 'scissors', 77: 'teddy bear', 78: 'hair drier', 79: 'toothbrush'
+}
+
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+class UltralyticsBackend:
+    """Current PyTorch path through ultralytics predict()"""
+
+    def __init__(self, model_path, imgsz, iou):
+        import torch
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.class_names = self.model.names
+        self.imgsz = imgsz
+        self.iou = iou
+        # FP16 solo con GPU: su CPU non porta nessun vantaggio
+        self.half = torch.cuda.is_available()
+
+    def predict(self, images, class_indices, conf):
+        results = self.model.predict(
+            list(images),
+            verbose=False,
+            classes=class_indices,
+            conf=conf,
+            iou=self.iou,
+            imgsz=self.imgsz,
+            half=self.half
+        )
+        return [result.boxes.data.cpu().numpy().astype(np.float32) for result in results]
+
+
+class ExportedModelBackend:
+    """
+    Common pre- and post-processing for the exported YOLOv8 models:
+    letterbox, normalization, output decoding and NMS are done in NumPy.
+    """
+
+    def __init__(self, imgsz, iou, max_det=300):
+        self.class_names = COCO_CLASS_NAMES
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+        self.max_batch = None  # None = batch dinamico
+
+    def _forward(self, blob):
+        raise NotImplementedError
+
+    def predict(self, images, class_indices, conf):
+        if not len(images):
+            return []
+
+        # Zone con profili di risoluzione diversi: un letterbox per ogni dimensione
+        shapes = {image.shape for image in images}
+        if len(shapes) > 1:
+            results = [None] * len(images)
+            for shape in shapes:
+                indices = [i for i, image in enumerate(images) if image.shape == shape]
+                group = self.predict([images[i] for i in indices], class_indices, conf)
+                for i, result in zip(indices, group):
+                    results[i] = result
+            return results
+
+        blob, gain, pad = self._preprocess(images)
+
+        # Modelli esportati con batch statico: un forward per immagine
+        step = self.max_batch or len(images)
+        outputs = []
+        for start in range(0, len(images), step):
+            outputs.append(self._forward(blob[start:start + step]))
+        output = np.concatenate(outputs, axis=0)
+
+        return [
+            self._postprocess(pred, class_indices, conf, gain, pad, image.shape[:2])
+            for pred, image in zip(output, images)
+        ]
+
+    def _preprocess(self, images):
+        return letterbox_images(images, self.imgsz)
+
+    def _postprocess(self, pred, class_indices, conf, gain, pad, orig_shape):
+        # pred: (4 + num_classes, num_anchors) -> (num_anchors, 4 + num_classes)
+        pred = pred.T
+        class_scores = pred[:, 4:]
+        if class_indices:
+            mask = np.zeros(class_scores.shape[1], dtype=bool)
+            mask[class_indices] = True
+            class_scores = np.where(mask, class_scores, 0.0)
+
+        cls = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(cls)), cls]
+        keep = scores > conf
+        if not keep.any():
+            return EMPTY_DETECTIONS
+
+        xywh = pred[keep, :4]
+        scores = scores[keep]
+        cls = cls[keep]
+        boxes = np.empty_like(xywh)
+        boxes[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        boxes[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        boxes[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        boxes[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+        # NMS per classe con offset delle coordinate (come ultralytics)
+        offsets = cls[:, None].astype(np.float32) * 7680.0
+        keep = nms(boxes + offsets, scores, self.iou)[:self.max_det]
+        boxes, scores, cls = boxes[keep], scores[keep], cls[keep]
+
+        # Back to the original image coordinates
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / gain
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / gain
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, orig_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, orig_shape[0])
+
+        return np.concatenate(
+            [boxes, scores[:, None], cls[:, None].astype(np.float32)], axis=1
+        ).astype(np.float32)
+
+
+class OnnxRuntimeBackend(ExportedModelBackend):
+    def __init__(self, model_path, imgsz, iou, num_threads=0):
+        super().__init__(imgsz, iou)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        if isinstance(model_input.shape[0], int):
+            self.max_batch = model_input.shape[0]
+
+    def _forward(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(ExportedModelBackend):
+    def __init__(self, model_path, imgsz, iou, num_threads=0):
+        super().__init__(imgsz, iou)
+        from openvino.runtime import Core
+
+        core = Core()
+        model = core.read_model(model_path)
+        config = {'INFERENCE_NUM_THREADS': str(num_threads)} if num_threads else {}
+        self.compiled_model = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled_model.output(0)
+        batch_dim = model.input(0).get_partial_shape()[0]
+        if batch_dim.is_static:
+            self.max_batch = batch_dim.get_length()
+
+    def _forward(self, blob):
+        return self.compiled_model([blob])[self.output]
+
+
+class TorchScriptBackend(ExportedModelBackend):
+    def __init__(self, model_path, imgsz, iou, num_threads=0):
+        super().__init__(imgsz, iou)
+        import torch
+
+        self.torch = torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = torch.jit.load(model_path, map_location='cpu')
+        self.model.eval()
+        # Il modello tracciato da ultralytics export ha le shape fissate a batch 1
+        self.max_batch = 1
+
+    def _forward(self, blob):
+        with self.torch.no_grad():
+            output = self.model(self.torch.from_numpy(blob))
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+        return output.numpy()
+
+
+BACKENDS = {
+    'ultralytics': UltralyticsBackend,
+    'onnxruntime': OnnxRuntimeBackend,
+    'onnxruntime-int8': OnnxRuntimeBackend,  # modello quantizzato (rcta_system/quantization.py)
+    'openvino': OpenVinoBackend,
+    'torchscript': TorchScriptBackend
+}
+
+
+def create_backend(name, model_path, imgsz, iou, num_threads=0):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{name}', available: {list(BACKENDS)}")
+    if name == 'ultralytics':
+        return UltralyticsBackend(model_path, imgsz, iou)
+    return BACKENDS[name](model_path, imgsz, iou, num_threads)
+
+
+def letterbox_images(images, imgsz):
+    """
+    Letterbox + normalization of same-size BGR images into a (B, 3, imgsz, imgsz)
+    float32 blob. Returns the blob, the resize gain and the (left, top) padding.
+    """
+    h, w = images[0].shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x = (imgsz - new_w) / 2
+    pad_y = (imgsz - new_h) / 2
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+
+    blob = np.full((len(images), imgsz, imgsz, 3), 114, dtype=np.uint8)
+    for i, image in enumerate(images):
+        resized = image if (new_w, new_h) == (w, h) else cv2.resize(
+            image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        blob[i, top:top + new_h, left:left + new_w] = resized
+
+    # BGR -> RGB, HWC -> CHW, [0, 1]
+    blob = blob[..., ::-1].transpose(0, 3, 1, 2)
+    blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+    return blob, gain, (left, top)
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy NMS, returns the kept indices sorted by descending score"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        inter_w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        inter_h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
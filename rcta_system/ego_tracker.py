@@ -0,0 +1,128 @@
+import threading
+import numpy as np
+import config
+from rcta_system.iou_tracker import _greedy_assignment
+from rcta_system.camera_rays import build_camera_rays
+
+
+class EgoTracker:
+    """
+    Single tracker for all the zones, in the ego vehicle frame.
+    Detections of every camera, already placed in the ego frame through the
+    camera ray tables (obj['ego_xyz']), are associated in one pass per tick
+    to constant-velocity tracks on the ego distance, so an object crossing
+    from one camera into the next keeps its id (and its TTC history).
+    """
+
+    def __init__(self, cameras=None,
+                 gate_m=config.EGO_TRACKER_GATE_M,
+                 max_age_sec=config.EGO_TRACKER_MAX_AGE_SEC):
+        # zone -> CameraRays, used for the field of view of each zone
+        self.cameras = cameras if cameras is not None else build_camera_rays()
+        self.gate_m = gate_m
+        self.max_age_sec = max_age_sec
+
+        self._lock = threading.Lock()
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.pos = np.zeros((0, 2), dtype=np.float64)
+        self.vel = np.zeros((0, 2), dtype=np.float64)  # m/s nel frame ego
+        self.cls = np.zeros(0, dtype=object)
+        self.zone = np.zeros(0, dtype=object)  # ultima zona che ha visto il track
+        self.time = np.zeros(0, dtype=np.float64)
+        self.handoffs = 0
+
+        print(f"EGO_TRACKER [Initialized for zones {list(self.cameras)}, gate={gate_m}m]")
+
+    def has_tracks(self, zone):
+        """Tracks last seen by the zone or predicted inside its field of view"""
+        with self._lock:
+            if not len(self.ids):
+                return False
+            if np.any(self.zone == zone):
+                return True
+            return bool(np.any(self.cameras[zone].sees(self.pos)))
+
+    def associate_batch(self, frames, zones):
+        """
+        One association pass over the fused objects of all zones of a tick.
+        frames: (fused_objects, timestamp) per zone. Sets obj['id'] and
+        obj['ego_vel'] (None for new tracks) and returns the object lists in the same order.
+        """
+        objects = [obj for fused, _ in frames for obj in fused]
+        if not frames:
+            return []
+        timestamp = max(t for _, t in frames)
+
+        with self._lock:
+            self._drop_old(timestamp)
+            if not objects:
+                return [fused for fused, _ in frames]
+
+            points = np.array([obj.get('ego_xyz', (np.nan, np.nan))[:2] for obj in objects], dtype=np.float64)
+            obj_zones = np.array([zone for (fused, _), zone in zip(frames, zones) for _ in fused], dtype=object)
+            obj_times = np.array([t for fused, t in frames for _ in fused], dtype=np.float64)
+            classes = np.array([obj['class'] for obj in objects], dtype=object)
+
+            det_idx = np.zeros(0, dtype=np.int64)
+            trk_idx = np.zeros(0, dtype=np.int64)
+            if len(self.ids):
+                dt = obj_times[:, None] - self.time[None, :]
+                pred = self.pos[None, :, :] + self.vel[None, :, :] * dt[:, :, None]
+                with np.errstate(invalid='ignore'):
+                    cost = np.linalg.norm(points[:, None, :] - pred, axis=2)
+                gate = ~(cost <= self.gate_m) | (classes[:, None] != self.cls[None, :])
+                cost[gate] = np.inf
+                det_idx, trk_idx = _greedy_assignment(cost)
+
+            if len(det_idx):
+                dt = np.maximum(obj_times[det_idx] - self.time[trk_idx], 1e-3)
+                self.vel[trk_idx] = (points[det_idx] - self.pos[trk_idx]) / dt[:, None]
+                self.pos[trk_idx] = points[det_idx]
+                self.time[trk_idx] = obj_times[det_idx]
+                self.handoffs += int(np.count_nonzero(self.zone[trk_idx] != obj_zones[det_idx]))
+                self.zone[trk_idx] = obj_zones[det_idx]
+
+            # Nuovi track solo per i punti validi (depth finita)
+            new_idx = np.setdiff1d(np.arange(len(objects)), det_idx)
+            new_ids = np.arange(self.next_id, self.next_id + len(new_idx), dtype=np.int64)
+            self.next_id += len(new_idx)
+            valid_new = np.isfinite(points[new_idx]).all(axis=1)
+            self.ids = np.concatenate([self.ids, new_ids[valid_new]])
+            self.pos = np.concatenate([self.pos, points[new_idx[valid_new]]])
+            self.vel = np.concatenate([self.vel, np.zeros((int(valid_new.sum()), 2))])
+            self.cls = np.concatenate([self.cls, classes[new_idx[valid_new]]])
+            self.zone = np.concatenate([self.zone, obj_zones[new_idx[valid_new]]])
+            self.time = np.concatenate([self.time, obj_times[new_idx[valid_new]]])
+
+            assigned = np.empty(len(objects), dtype=np.int64)
+            assigned[det_idx] = self.ids[trk_idx]
+            assigned[new_idx] = new_ids
+            # Velocita' relativa nel frame ego, nota solo per i track gia' esistenti
+            velocities = [None] * len(objects)
+            for d, v in zip(det_idx.tolist(), self.vel[trk_idx].tolist()):
+                velocities[d] = v
+
+        for obj, track_id, velocity in zip(objects, assigned.tolist(), velocities):
+            obj['id'] = track_id
+            obj['ego_vel'] = velocity
+        return [fused for fused, _ in frames]
+
+    def expire(self, timestamp):
+        with self._lock:
+            self._drop_old(timestamp)
+
+    def _drop_old(self, timestamp):
+        keep = timestamp - self.time <= self.max_age_sec
+        if keep.all():
+            return
+        self.ids = self.ids[keep]
+        self.pos = self.pos[keep]
+        self.vel = self.vel[keep]
+        self.cls = self.cls[keep]
+        self.zone = self.zone[keep]
+        self.time = self.time[keep]
+
+    def get_stats(self):
+        with self._lock:
+            return {'tracks': int(len(self.ids)), 'handoffs': self.handoffs, 'next_id': self.next_id}
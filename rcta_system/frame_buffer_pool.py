@@ -0,0 +1,57 @@
+import threading
+from collections import deque
+import numpy as np
+import config
+
+
+class FrameBuffers:
+    """Contiguous BGR buffer reused across frames, allocated at the zone RGB resolution"""
+
+    def __init__(self, height, width):
+        self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+
+    def bgr_for(self, height, width):
+        # Riallocato solo se la camera non rispetta il profilo della zona
+        if self.bgr.shape != (height, width, 3):
+            self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+        return self.bgr
+
+
+class FrameBufferPool:
+    """
+    Per-zone pool of frame buffers, pre-allocated from the RGB profile of each zone.
+    A worker acquires a slot, converts the raw CARLA data into it in place and
+    releases it when the pipeline is done with the frame.
+    The depth is never decoded to a full frame (ROI kernels of depth_roi.py),
+    so there is no depth buffer.
+    """
+
+    def __init__(self, zone_definitions=config.RCTA_ZONE_DEFINITIONS, slots_per_zone=config.FRAME_POOL_SLOTS):
+        self._lock = threading.Lock()
+        self._free = {
+            zone['name']: deque(FrameBuffers(zone['rgb']['height'], zone['rgb']['width'])
+                                for _ in range(slots_per_zone))
+            for zone in zone_definitions
+        }
+        self._stats = {zone: {'acquired': 0, 'exhausted': 0} for zone in self._free}
+
+        print(f"FRAME_POOL [Initialized: {slots_per_zone} slots per zone]")
+
+    def acquire(self, zone):
+        with self._lock:
+            self._stats[zone]['acquired'] += 1
+            if self._free[zone]:
+                return self._free[zone].popleft()
+            # Pool esaurito: la conversione allochera' un buffer temporaneo
+            self._stats[zone]['exhausted'] += 1
+        return None
+
+    def release(self, zone, buffers):
+        if buffers is None:
+            return
+        with self._lock:
+            self._free[zone].append(buffers)
+
+    def get_stats(self):
+        with self._lock:
+            return {zone: dict(stats) for zone, stats in self._stats.items()}
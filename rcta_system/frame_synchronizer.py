@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+import config
+
+
+class FrameSynchronizer:
+    """
+    Pairs RGB and Depth images of the same zone by CARLA frame number.
+    Unmatched images wait in a small bounded buffer per stream and are evicted
+    when the buffer is full, when they time out or when a newer pair is emitted.
+    """
+
+    SENSOR_TYPES = ("rgb", "depth")
+
+    def __init__(self, zones,
+                 buffer_size=config.SYNC_BUFFER_SIZE,
+                 timeout_sec=config.SYNC_TIMEOUT_SEC):
+        self.zones = list(zones)
+        self.buffer_size = buffer_size
+        self.timeout_sec = timeout_sec
+
+        self._locks = {zone: threading.Lock() for zone in self.zones}
+        # zone -> sensor_type -> OrderedDict(frame -> (arrival_time, image))
+        self._buffers = {
+            zone: {sensor_type: OrderedDict() for sensor_type in self.SENSOR_TYPES}
+            for zone in self.zones
+        }
+        self._last_emitted_frame = {zone: -1 for zone in self.zones}
+        self._stats = {
+            zone: {'matched': 0, 'mismatched': 0, 'dropped': 0}
+            for zone in self.zones
+        }
+
+        print(f"FRAME_SYNC [Initialized: buffer={buffer_size}, timeout={timeout_sec}s]")
+
+    def push(self, zone, sensor_type, image):
+        """
+        Adds an image and returns the (rgb, depth) pair of the same frame
+        if both are available, otherwise None.
+        """
+        if zone not in self._buffers or sensor_type not in self.SENSOR_TYPES:
+            print(f"FRAME_SYNC [ERROR: Unknown stream {zone}/{sensor_type}]")
+            return None
+
+        now = time.perf_counter()
+        frame = image.frame
+        other_type = "depth" if sensor_type == "rgb" else "rgb"
+
+        with self._locks[zone]:
+            buffers = self._buffers[zone]
+            stats = self._stats[zone]
+            own = buffers[sensor_type]
+            other = buffers[other_type]
+
+            self._evict_expired(zone, now)
+
+            # Frame piu' vecchio di una coppia gia' emessa: non serve piu'
+            if frame <= self._last_emitted_frame[zone]:
+                stats['dropped'] += 1
+                return None
+
+            if frame in other:
+                _, partner = other.pop(frame)
+                own.pop(frame, None)
+                stats['matched'] += 1
+                self._last_emitted_frame[zone] = frame
+                self._evict_older(zone, frame)
+
+                if sensor_type == "rgb":
+                    return image, partner
+                return partner, image
+
+            if other:
+                # L'altro stream ha frame diversi in attesa: con l'accoppiamento
+                # "ultimo arrivato" questi due sarebbero stati fusi insieme
+                stats['mismatched'] += 1
+
+            own[frame] = (now, image)
+            while len(own) > self.buffer_size:
+                own.popitem(last=False)
+                stats['dropped'] += 1
+
+            return None
+
+    def _evict_expired(self, zone, now):
+        for buffer in self._buffers[zone].values():
+            while buffer:
+                arrival_time, _ = next(iter(buffer.values()))
+                if now - arrival_time <= self.timeout_sec:
+                    break
+                buffer.popitem(last=False)
+                self._stats[zone]['dropped'] += 1
+
+    def _evict_older(self, zone, frame):
+        for buffer in self._buffers[zone].values():
+            stale = [f for f in buffer if f < frame]
+            for f in stale:
+                del buffer[f]
+            self._stats[zone]['dropped'] += len(stale)
+
+    def get_stats(self):
+        report = {}
+        for zone in self.zones:
+            with self._locks[zone]:
+                report[zone] = dict(self._stats[zone])
+                report[zone]['buffered'] = sum(len(b) for b in self._buffers[zone].values())
+        return report
@@ -0,0 +1,131 @@
+import threading
+import time
+import config
+
+
+class InferenceEngine:
+    """
+    Shared batched inference for all zones.
+    Every zone hands in its latest frame; pending frames are run together as
+    one batch and each result is given back to the zone that submitted it.
+    Frames and skips carry a round id (the CARLA frame number): a skip only
+    counts for the round it was made in, so rounds where every zone skipped
+    leave nothing behind for the next ones.
+    """
+
+    def __init__(self, zones, batch_fn, batch_window_sec=config.INFERENCE_BATCH_WINDOW_SEC):
+        # batch_fn(frames, zones) -> one result per frame, same order
+        self.zones = list(zones)
+        self.batch_fn = batch_fn
+        self.batch_window_sec = batch_window_sec
+
+        self._cond = threading.Condition()
+        self._pending = {}  # zone -> (ticket, frame, round_id), solo il frame piu' recente
+        self._skipped = {}  # zone -> ultimo round per cui la zona non invia un frame
+        self._results = {}  # ticket -> result
+        self._next_ticket = 0
+        self._first_pending_time = None
+        self._running_batch = False
+
+        # Statistics
+        self.batch_count = 0
+        self.frame_count = 0
+        self.superseded_count = 0
+        self.total_batch_time = 0.0
+
+        print(f"INFERENCE_ENGINE [Initialized for zones {self.zones}, window={batch_window_sec}s]")
+
+    def infer(self, zone, frame, round_id):
+        """
+        Blocks until the batch containing this frame has been processed.
+        Returns None if the frame was superseded by a newer one of the same zone.
+        """
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+
+            if zone in self._pending:
+                old_ticket, _, _ = self._pending[zone]
+                self._results[old_ticket] = None
+                self.superseded_count += 1
+
+            self._pending[zone] = (ticket, frame, round_id)
+            if self._first_pending_time is None:
+                self._first_pending_time = time.perf_counter()
+            self._cond.notify_all()
+
+            while ticket not in self._results:
+                remaining = self._remaining_window()
+                if self._running_batch or remaining == float('inf'):
+                    self._cond.wait()
+                    continue
+
+                if remaining > 0.0:
+                    self._cond.wait(remaining)
+                    continue
+
+                self._run_batch()
+
+            return self._results.pop(ticket)
+
+    def skip(self, zone, round_id):
+        """The zone has no frame for this round, the batch does not wait for it"""
+        with self._cond:
+            self._skipped[zone] = max(round_id, self._skipped.get(zone, round_id))
+            self._cond.notify_all()
+
+    def _remaining_window(self):
+        if not self._pending:
+            return float('inf')
+        # Le zone saltate contano solo se hanno gia' rinunciato al round dei frame in attesa
+        round_id = max(r for _, _, r in self._pending.values())
+        if all(zone in self._pending or self._skipped.get(zone, round_id - 1) >= round_id for zone in self.zones):
+            return 0.0
+        elapsed = time.perf_counter() - self._first_pending_time
+        return self.batch_window_sec - elapsed
+
+    def _run_batch(self):
+        # Called with the lock held: the lock is released during inference
+        # so that zones can keep queueing frames for the next batch
+        batch = [(zone, ticket, frame) for zone, (ticket, frame, _) in self._pending.items()]
+        self._pending = {}
+        self._first_pending_time = None
+        self._running_batch = True
+
+        zones = [zone for zone, _, _ in batch]
+        frames = [frame for _, _, frame in batch]
+        outputs = None
+
+        self._cond.release()
+        start = time.perf_counter()
+        try:
+            outputs = self.batch_fn(frames, zones)
+        except Exception as e:
+            print(f"INFERENCE_ENGINE [ERROR: batch {zones} failed: {e}]")
+        finally:
+            elapsed = time.perf_counter() - start
+            self._cond.acquire()
+
+        if outputs is None:
+            outputs = [None] * len(batch)
+
+        for (_, ticket, _), output in zip(batch, outputs):
+            self._results[ticket] = output
+
+        self.batch_count += 1
+        self.frame_count += len(batch)
+        self.total_batch_time += elapsed
+        self._running_batch = False
+        self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            avg_batch = self.frame_count / self.batch_count if self.batch_count else 0.0
+            avg_time = self.total_batch_time / self.batch_count if self.batch_count else 0.0
+            return {
+                'batches': self.batch_count,
+                'frames': self.frame_count,
+                'superseded': self.superseded_count,
+                'avg_batch_size': avg_batch,
+                'avg_batch_time_sec': avg_time
+            }
@@ -0,0 +1,153 @@
+import numpy as np
+import config
+
+
+class IouDepthTracker:
+    """
+    Multi-object tracker of one zone, fully in NumPy.
+    Detections are associated to the tracks on a cost that mixes the IoU with
+    the predicted box and the consistency of the measured distance; pairs of
+    different class, too little overlap or too different depth are never
+    associated. Unmatched detections start new tracks.
+    """
+
+    def __init__(self,
+                 iou_weight=config.TRACKER_IOU_WEIGHT,
+                 min_iou=config.TRACKER_MIN_IOU,
+                 max_depth_rel_diff=config.TRACKER_MAX_DEPTH_REL_DIFF,
+                 max_age_sec=config.TRACKER_MAX_AGE_SEC,
+                 assignment=config.TRACKER_ASSIGNMENT):
+        self.iou_weight = iou_weight
+        self.min_iou = min_iou
+        self.max_depth_rel_diff = max_depth_rel_diff
+        self.max_age_sec = max_age_sec
+
+        if assignment == 'hungarian':
+            from scipy.optimize import linear_sum_assignment
+            # Coppie vietate con costo alto invece di inf (matrice sempre risolvibile)
+            self._assign = lambda cost: linear_sum_assignment(np.where(np.isfinite(cost), cost, 1e6))
+        elif assignment == 'greedy':
+            self._assign = _greedy_assignment
+        else:
+            raise ValueError(f"Unknown assignment '{assignment}', use 'greedy' or 'hungarian'")
+
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float64)
+        self.box_velocity = np.zeros((0, 4), dtype=np.float64)  # px/s
+        self.dist = np.zeros(0, dtype=np.float64)
+        self.range_rate = np.zeros(0, dtype=np.float64)  # m/s
+        self.cls = np.zeros(0, dtype=object)
+        self.time = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, objects, timestamp):
+        """
+        Assigns obj['id'] to every fused object (needs 'bbox', 'class', 'dist')
+        and updates the tracks. Returns the same list.
+        """
+        self._drop_old(timestamp)
+
+        n = len(objects)
+        if n == 0:
+            return objects
+
+        boxes = np.array([obj['bbox'] for obj in objects], dtype=np.float64)
+        dists = np.array([obj['dist'] for obj in objects], dtype=np.float64)
+        classes = np.array([obj['class'] for obj in objects], dtype=object)
+
+        det_idx = np.zeros(0, dtype=np.int64)
+        trk_idx = np.zeros(0, dtype=np.int64)
+        if len(self.ids):
+            cost = self._cost_matrix(boxes, dists, classes, timestamp)
+            det_idx, trk_idx = self._assign(cost)
+            det_idx, trk_idx = np.asarray(det_idx), np.asarray(trk_idx)
+            valid = np.isfinite(cost[det_idx, trk_idx])
+            det_idx, trk_idx = det_idx[valid], trk_idx[valid]
+
+        # Tracks associati: velocita' del box e della distanza dall'ultimo aggiornamento
+        if len(det_idx):
+            dt = np.maximum(timestamp - self.time[trk_idx], 1e-3)
+            self.box_velocity[trk_idx] = (boxes[det_idx] - self.boxes[trk_idx]) / dt[:, None]
+            with np.errstate(invalid='ignore'):
+                rate = (dists[det_idx] - self.dist[trk_idx]) / dt
+            self.range_rate[trk_idx] = np.where(np.isfinite(rate), rate, 0.0)
+            self.boxes[trk_idx] = boxes[det_idx]
+            self.dist[trk_idx] = dists[det_idx]
+            self.time[trk_idx] = timestamp
+
+        # Detections non associate: nuovi track
+        new_idx = np.setdiff1d(np.arange(n), det_idx)
+        new_ids = np.arange(self.next_id, self.next_id + len(new_idx), dtype=np.int64)
+        self.next_id += len(new_idx)
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.boxes = np.concatenate([self.boxes, boxes[new_idx]])
+        self.box_velocity = np.concatenate([self.box_velocity, np.zeros((len(new_idx), 4))])
+        self.dist = np.concatenate([self.dist, dists[new_idx]])
+        self.range_rate = np.concatenate([self.range_rate, np.zeros(len(new_idx))])
+        self.cls = np.concatenate([self.cls, classes[new_idx]])
+        self.time = np.concatenate([self.time, np.full(len(new_idx), float(timestamp))])
+
+        assigned = np.empty(n, dtype=np.int64)
+        assigned[det_idx] = self.ids[trk_idx]
+        assigned[new_idx] = new_ids
+        for obj, track_id in zip(objects, assigned.tolist()):
+            obj['id'] = track_id
+        return objects
+
+    def _cost_matrix(self, boxes, dists, classes, timestamp):
+        """(detections, tracks) cost, inf for the pairs that cannot be associated"""
+        dt = (timestamp - self.time)[:, None]
+        pred_boxes = self.boxes + self.box_velocity * dt
+        pred_dist = self.dist + self.range_rate * dt[:, 0]
+
+        iou = box_iou_matrix(boxes, pred_boxes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            depth_diff = np.abs(dists[:, None] - pred_dist[None, :]) / np.maximum(pred_dist[None, :], 1.0)
+        # Depth non valida (inf) da una delle due parti: decide solo l'IoU
+        depth_diff = np.where(np.isfinite(depth_diff), depth_diff, 0.0)
+
+        cost = self.iou_weight * (1.0 - iou) + (1.0 - self.iou_weight) * depth_diff / self.max_depth_rel_diff
+        gate = (iou < self.min_iou) | (depth_diff > self.max_depth_rel_diff) | (classes[:, None] != self.cls[None, :])
+        cost[gate] = np.inf
+        return cost
+
+    def _drop_old(self, timestamp):
+        keep = timestamp - self.time <= self.max_age_sec
+        if keep.all():
+            return
+        self.ids = self.ids[keep]
+        self.boxes = self.boxes[keep]
+        self.box_velocity = self.box_velocity[keep]
+        self.dist = self.dist[keep]
+        self.range_rate = self.range_rate[keep]
+        self.cls = self.cls[keep]
+        self.time = self.time[keep]
+
+
+def box_iou_matrix(a, b):
+    """IoU between every box of a (N, 4) and every box of b (M, 4), xyxy"""
+    inter_w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _greedy_assignment(cost):
+    """Lowest-cost pairs first, each row and column used at most once"""
+    rows, cols = np.nonzero(np.isfinite(cost))
+    order = np.argsort(cost[rows, cols], kind='stable')
+    used_rows, used_cols = set(), set()
+    det_idx, trk_idx = [], []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        det_idx.append(r)
+        trk_idx.append(c)
+    return np.array(det_idx, dtype=np.int64), np.array(trk_idx, dtype=np.int64)
@@ -1,17 +1,29 @@
 from time import perf_counter
 import numpy as np
 import config
-from ultralytics import YOLO
+from rcta_system.detector_backends import create_backend
 import time
 
 
 class ObjectDetector:
-    def __init__(self, model_path=config.YOLO_MODEL_PATH):
-        print(f"OBJECT_DETECTOR [loading of YOLO model from {model_path}]")
+    def __init__(self, model_path=None, backend=config.DETECTOR_BACKEND):
+        if model_path is None:
+            model_path = config.DETECTOR_MODEL_PATHS[backend]
+        print(f"OBJECT_DETECTOR [loading of YOLO model from {model_path} (backend: {backend})]")
+
+        # Stateless: il tracking e' fatto per zona in Perception (IouDepthTracker)
+        self.backend_name = backend
+        self.confidence = config.DETECTOR_CONFIDENCE
+
         try:
-            self.model = YOLO(model_path)
-            self.class_names = self.model.names
-            self.target_classes = {'person', 'bicycle', 'car', 'bus', 'truck'}
+            self.backend = create_backend(
+                backend, model_path,
+                imgsz=config.DETECTOR_IMGSZ,
+                iou=config.DETECTOR_IOU,
+                num_threads=config.DETECTOR_NUM_THREADS
+            )
+            self.class_names = self.backend.class_names
+            self.target_classes = set(config.ALERT_CLASSES)
 
             self.target_class_indices = [
                 k for k, v in self.class_names.items() if v in self.target_classes
@@ -25,44 +37,43 @@ class ObjectDetector:
                     (config.CAMERA_IMAGE_HEIGHT, config.CAMERA_IMAGE_WIDTH, 3),
                     dtype=np.uint8
                 )
-                self.model.track(dummy_img, verbose=False, persist=False)
+                self.backend.predict([dummy_img], self.target_class_indices, self.confidence)
                 print("OBJECT_DETECTOR [Model is ready.]")
             except Exception as e:
                 print(f"OBJECT_DETECTOR [Warning: Model warm-up failed: {e}]")
 
         except Exception as e:
             print(f"OBJECT_DETECTOR [Error: {e}]")
-            self.model = None
-
-    def detect(self, rgb_image):
-        if self.model is None:
-            return []
+            self.backend = None
 
-        results = self.model.track(
-            rgb_image,
-            verbose=False,
-            classes=self.target_class_indices,
-            conf=0.5,
-            persist=True,
-            half = True  # Usa FP16 se hai GPU compatibile (velocizza ~2x)
-        )
+    def predict(self, rgb_images):
+        """Raw (N, 6) detections [x1, y1, x2, y2, conf, cls] per image, no tracking"""
+        if self.backend is None or not rgb_images:
+            return [np.zeros((0, 6), dtype=np.float32) for _ in rgb_images]
+        return self.backend.predict(rgb_images, self.target_class_indices, self.confidence)
 
-        if not results or results[0].boxes.id is None:
-            return []
+    def detect(self, rgb_image, stream_key="default"):
+        return self.detect_batch([rgb_image], [stream_key])[0]
 
-        #vectorizzazione
-        boxes = results[0].boxes.cpu().numpy()
-        detections = []
+    def detect_batch(self, rgb_images, stream_keys=None):
+        """
+        Runs a single forward pass over a batch of images.
+        Returns one list of detections per input image, in the same order.
+        The stream keys are accepted for the inference engine but not used:
+        the detector holds no per-stream state.
+        """
+        if self.backend is None or not rgb_images:
+            return [[] for _ in rgb_images]
 
-        for box in boxes:
-            if box.id is None:
-                continue
+        predictions = self.predict(list(rgb_images))
+        return [self._to_detections(det) for det in predictions]
 
+    def _to_detections(self, det):
+        detections = []
+        for x1, y1, x2, y2, conf, cls in det.tolist():
             detections.append({
-                'id': int(box.id[0]),
-                'class': self.class_names[int(box.cls[0])],
-                'confidence': float(box.conf[0]),
-                'bbox': box.xyxy[0].astype(int).tolist()
+                'class': self.class_names[int(cls)],
+                'confidence': float(conf),
+                'bbox': [int(x1), int(y1), int(x2), int(y2)]
             })
-
-        return detections
\ No newline at end of file
+        return detections
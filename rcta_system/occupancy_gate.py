@@ -0,0 +1,77 @@
+import threading
+import numpy as np
+import config
+from rcta_system.depth_roi import _depth_grid_min
+
+
+class OccupancyGate:
+    """
+    Cheap depth-only pre-filter run before YOLO.
+    The depth band of the road is reduced to a coarse grid of minimum
+    distances and compared with the previous grid of the same zone: inference
+    runs only if some cell in range is new or getting closer.
+    """
+
+    def __init__(self, zones,
+                 range_m=config.GATE_RANGE_M,
+                 row_band=config.GATE_ROW_BAND,
+                 cell_px=config.GATE_CELL_PX,
+                 closing_delta_m=config.GATE_CLOSING_DELTA_M,
+                 min_cells=config.GATE_MIN_CELLS,
+                 max_skipped_frames=config.GATE_MAX_SKIPPED_FRAMES):
+        self.range_m = range_m
+        self.row_band = row_band
+        self.cell_px = cell_px
+        self.closing_delta_m = closing_delta_m
+        self.min_cells = min_cells
+        self.max_skipped_frames = max_skipped_frames
+
+        self._lock = threading.Lock()
+        self._previous_grid = {zone: None for zone in zones}
+        self._skipped_in_row = {zone: 0 for zone in zones}
+        self._stats = {zone: {'checked': 0, 'skipped': 0} for zone in zones}
+
+        print(f"OCCUPANCY_GATE [Initialized: range={range_m}m, band={row_band}, cell={cell_px}px]")
+
+    def should_run(self, zone, depth_raw, has_tracks=False):
+        """True if the zone needs inference on this frame"""
+        h = depth_raw.shape[0]
+        row_start = int(h * self.row_band[0])
+        row_end = int(h * self.row_band[1])
+        grid = _depth_grid_min(depth_raw, row_start, row_end, self.cell_px)
+
+        with self._lock:
+            previous = self._previous_grid[zone]
+            self._previous_grid[zone] = grid
+            self._stats[zone]['checked'] += 1
+
+            # Con oggetti tracciati l'inferenza non si salta mai (continuita' del TTC)
+            run = has_tracks or previous is None or previous.shape != grid.shape
+            if not run:
+                in_range = grid < self.range_m
+                closing = (previous - grid) > self.closing_delta_m
+                run = bool(np.count_nonzero(in_range & closing) >= self.min_cells)
+
+            # Refresh periodico: un oggetto fermo in range non sfugge per sempre
+            if not run and self._skipped_in_row[zone] >= self.max_skipped_frames:
+                run = True
+
+            if run:
+                self._skipped_in_row[zone] = 0
+            else:
+                self._skipped_in_row[zone] += 1
+                self._stats[zone]['skipped'] += 1
+
+        return run
+
+    def get_stats(self):
+        with self._lock:
+            report = {}
+            for zone, stats in self._stats.items():
+                checked = stats['checked']
+                report[zone] = {
+                    'checked': checked,
+                    'skipped': stats['skipped'],
+                    'skip_rate': stats['skipped'] / checked if checked else 0.0
+                }
+            return report
@@ -1,116 +1,224 @@
 import numpy as np
-import numba
+import threading
 import time
+import config
 from rcta_system.object_detector import ObjectDetector
-
-
-@numba.jit(nopython=True, fastmath=True)
-def _decode_depth_to_meters(array_uint8):
-    h, w, _ = array_uint8.shape
-    depth_meters = np.empty((h, w), dtype=np.float32)
-    inv_max_val = 1.0 / (256.0 * 256.0 * 256.0 - 1.0)
-
-    for y in range(h):
-        for x in range(w):
-            B = float(array_uint8[y, x, 0])
-            G = float(array_uint8[y, x, 1])
-            R = float(array_uint8[y, x, 2])
-            normalized = (R + G * 256.0 + B * 256.0 * 256.0) * inv_max_val
-            depth_meters[y, x] = normalized * 1000.0
-
-    return depth_meters
+from rcta_system.inference_engine import InferenceEngine
+from rcta_system.depth_roi import _roi_distances, ROI_METHODS, warm_up
+from rcta_system.frame_buffer_pool import FrameBufferPool
+from rcta_system.occupancy_gate import OccupancyGate
+from rcta_system.box_propagator import BoxPropagator
+from rcta_system.track_table import TrackTable
+from rcta_system.iou_tracker import IouDepthTracker
+from rcta_system.ego_tracker import EgoTracker
+from rcta_system.camera_rays import build_camera_rays
 
 
 class Perception:
     def __init__(self):
-        """Initialize perception system with detectors for each zone"""
-        print("PERCEPTION [Initializing YOLO detectors for all zones]")
-
-        # One detector per zone (independent)
-        self.detector_rear = ObjectDetector()
-        self.detector_left = ObjectDetector()
-        self.detector_right = ObjectDetector()
-
-        # Tracking state for each zone
-        self.tracked_objects_rear = {}
-        self.tracked_objects_left = {}
-        self.tracked_objects_right = {}
-
-        # Cleanup timestamps
-        self.last_cleanup_time_rear = 0.0
-        self.last_cleanup_time_left = 0.0
-        self.last_cleanup_time_right = 0.0
+        """Initialize perception system with one shared detector for all zones"""
+        print("PERCEPTION [Initializing shared YOLO detector for all zones]")
+
+        # One stateless model for all zones, frames are batched by the inference engine
+        self.detector = ObjectDetector()
+        self.inference_engine = InferenceEngine(config.RCTA_ZONES, self.detector.detect_batch)
+
+        # Per-pixel ray tables of each camera: planar depth -> range / ego point
+        self.camera_rays = build_camera_rays()
+        # Depth camera resolution relative to the rgb one (boxes are in rgb pixels)
+        self.depth_scale = {
+            zone['name']: zone['depth']['width'] / zone['rgb']['width'] for zone in config.RCTA_ZONE_DEFINITIONS
+        }
+
+        # Id assignment: one tracker in the ego frame for all zones (ids survive
+        # the handoff between cameras), or one IoU + depth tracker per zone
+        self.ego_tracker = None
+        self.tracking_rounds = None
+        self.trackers = {}
+        if config.EGO_TRACKING_ENABLED:
+            self.ego_tracker = EgoTracker(self.camera_rays)
+            # Same round batching as the detector: one association pass per tick
+            self.tracking_rounds = InferenceEngine(
+                config.RCTA_ZONES, self.ego_tracker.associate_batch, config.EGO_TRACKER_ROUND_WINDOW_SEC
+            )
+        else:
+            self.trackers = {zone: IouDepthTracker() for zone in config.RCTA_ZONES}
+
+        # Reused conversion buffers, no allocation per frame in the hot path
+        self.buffer_pool = FrameBufferPool()
+
+        # Depth pre-filter: skips YOLO when a zone is provably empty
+        self.occupancy_gate = OccupancyGate(config.RCTA_ZONES) if config.GATE_ENABLED else None
+
+        # Tracking state for each zone (NumPy track tables).
+        # With global ids the TTC history is shared, so it follows the object across zones.
+        self._tracks_lock = threading.Lock()
+        if self.ego_tracker is not None:
+            shared_tracks = TrackTable()
+            self.tracked_objects = {zone: shared_tracks for zone in config.RCTA_ZONES}
+        else:
+            self.tracked_objects = {zone: TrackTable() for zone in config.RCTA_ZONES}
 
         # Constants
         self.STALE_TRACK_THRESHOLD_SEC = 1.0
         self.MIN_VELOCITY_FOR_TTC_MPS = 0.5
+        self.DISTANCE_PERCENTILE = 10.0  # 10th percentile to avoid outliers
+        self.roi_method = ROI_METHODS[config.ROI_QUANTILE_METHOD]
+        self.roi_max_samples = config.ROI_MAX_SAMPLES
+
+        # Detect-and-propagate: YOLO only on keyframes
+        self.box_propagator = None
+        if config.PROPAGATION_ENABLED:
+            self.box_propagator = BoxPropagator(
+                config.RCTA_ZONES, self.roi_method, self.roi_max_samples, self.DISTANCE_PERCENTILE
+            )
+
+        # Compilazione dei kernel numba ora, non al primo frame in retromarcia
+        start = time.perf_counter()
+        warm_up(self.DISTANCE_PERCENTILE, self.roi_method, self.roi_max_samples, config.GATE_CELL_PX)
+        print(f"PERCEPTION [Depth kernels ready in {time.perf_counter() - start:.1f}s]")
 
         print("PERCEPTION [Initialized successfully]")
 
-    def to_numpy_rgb(self, carla_img):
+    def detect(self, zone, rgb_image, round_id):
+        """Returns the detections for this zone, or None if the frame was superseded"""
+        return self.inference_engine.infer(zone, rgb_image, round_id)
+
+    def needs_inference(self, zone, depth_raw, tracked_objects, round_id):
+        if self.occupancy_gate is None:
+            return True
+        if self.ego_tracker is not None:
+            # Anche i track predetti in arrivo da un'altra zona tengono aperto il gate
+            has_tracks = self.ego_tracker.has_tracks(zone)
+        else:
+            has_tracks = bool(tracked_objects)
+        if self.occupancy_gate.should_run(zone, depth_raw, has_tracks=has_tracks):
+            return True
+        self.inference_engine.skip(zone, round_id)
+        return False
+
+    def track(self, zone, fused_objects, timestamp, round_id, propagated=False):
+        """Assigns the track ids, returns the objects or None if the round failed"""
+        if self.tracking_rounds is not None:
+            return self.tracking_rounds.infer(zone, (fused_objects, timestamp), round_id)
+        if not propagated:
+            # I box propagati hanno gia' l'id del keyframe
+            self.trackers[zone].update(fused_objects, timestamp)
+        return fused_objects
+
+    def skip_tracking(self, zone, round_id):
+        if self.tracking_rounds is not None:
+            self.tracking_rounds.skip(zone, round_id)
+
+    def perceive(self, zone, rgb_image, depth_raw, timestamp, buffers, tracked_objects):
+        """
+        Detection (or propagation) + depth fusion for one synced frame pair.
+        Returns the fused objects, or None if the frame produced no result.
+        """
+        # Round dei batch: le camere con lo stesso sensor_tick condividono il frame CARLA
+        round_id = rgb_image.frame
+        if not self.needs_inference(zone, depth_raw, tracked_objects, round_id):
+            self.skip_tracking(zone, round_id)
+            return None
+
+        if self.box_propagator is not None and not self.box_propagator.needs_keyframe(zone):
+            fused_objects = self.box_propagator.propagate(zone, depth_raw, timestamp, self.depth_scale[zone])
+            if fused_objects is not None:
+                self.inference_engine.skip(zone, round_id)
+                self.localize(zone, fused_objects)
+                return self.track(zone, fused_objects, timestamp, round_id, propagated=True)
+
+        rgb_np = self.to_numpy_rgb(rgb_image, buffers)
+        detections = self.detect(zone, rgb_np, round_id)
+        if detections is None:
+            # Frame superato da uno piu' recente della stessa zona
+            self.skip_tracking(zone, round_id)
+            return None
+
+        fused_objects = self.track(zone, self.fuse_results(detections, depth_raw, zone), timestamp, round_id)
+        if fused_objects is None:
+            return None
+        if self.box_propagator is not None:
+            self.box_propagator.update_keyframe(zone, fused_objects, timestamp)
+        return fused_objects
+
+    def to_numpy_rgb(self, carla_img, buffers=None):
         array = np.frombuffer(carla_img.raw_data, dtype=np.uint8)
         array = np.reshape(array, (carla_img.height, carla_img.width, 4))
-        return array[:, :, :3]  # Remove alpha channel
+        if buffers is None:
+            return np.ascontiguousarray(array[:, :, :3])  # Remove alpha channel
 
-    def to_depth_meters(self, carla_img):
+        # Remove alpha channel, copied in place into the contiguous pool buffer
+        bgr = buffers.bgr_for(carla_img.height, carla_img.width)
+        np.copyto(bgr, array[:, :, :3])
+        return bgr
+
+    def to_depth_raw(self, carla_img):
+        """Raw BGRA depth image (no copy, no decoding)"""
         array_uint8 = np.frombuffer(carla_img.raw_data, dtype=np.uint8)
-        array_uint8 = np.reshape(array_uint8, (carla_img.height, carla_img.width, 4))
-        return _decode_depth_to_meters(array_uint8)
+        return np.reshape(array_uint8, (carla_img.height, carla_img.width, 4))
 
-    def fuse_results(self, detections, depth_map):
-        h, w = depth_map.shape
+    def fuse_results(self, detections, depth_raw, zone=None):
         fused = []
-
-        for det in detections:
-            x1, y1, x2, y2 = map(int, det['bbox'])
-
-            # Clipping to avoid out of bounds
-            x1, x2 = max(0, x1), min(w, x2)
-            y1, y2 = max(0, y1), min(h, y2)
-
-            obj_dist = float('inf')
-            if x1 < x2 and y1 < y2:
-                roi = depth_map[y1:y2, x1:x2]
-                if roi.size > 0:
-                    # Use 10th percentile to avoid outliers
-                    obj_dist = np.percentile(roi, 10)
-
-            det['dist'] = obj_dist
+        if not detections:
+            return fused
+
+        boxes = np.array([det['bbox'] for det in detections], dtype=np.int64)
+        depth_scale = self.depth_scale[zone] if zone is not None else 1.0
+        depths = _roi_distances(
+            depth_raw, boxes, self.DISTANCE_PERCENTILE, self.roi_method, self.roi_max_samples, depth_scale
+        )
+
+        for det, obj_depth in zip(detections, depths):
+            det['depth'] = float(obj_depth)  # planar depth of the ROI
+            det['dist'] = float(obj_depth)
             det['ttc_obj'] = float('inf')  # Will be calculated in tracking
             fused.append(det)
 
+        if zone is not None:
+            self.localize(zone, fused)
         return fused
 
+    def localize(self, zone, fused_objects):
+        """Euclidean range ('dist') and ego point ('ego_xyz') from the planar depth"""
+        if not fused_objects:
+            return
+        boxes = np.array([obj['bbox'] for obj in fused_objects], dtype=np.int64)
+        depths = np.array([obj['depth'] for obj in fused_objects], dtype=np.float64)
+        ranges, points = self.camera_rays[zone].localize(boxes, depths)
+        for obj, obj_range, point in zip(fused_objects, ranges.tolist(), points.tolist()):
+            obj['dist'] = obj_range
+            obj['ego_xyz'] = point
+
     def update_tracks_and_calc_ttc(self, current_objects, current_time, tracked_objects):
-        for obj in current_objects:
-            track_id = obj['id']
-
-            if track_id in tracked_objects:
-                # Object was seen before, calculate velocity and TTC
-                prev_state = tracked_objects[track_id]
-                delta_t = current_time - prev_state['time']
-                delta_d = prev_state['dist'] - obj['dist']  # Positive if approaching
-
-                if delta_t > 0.0:
-                    rel_velocity = delta_d / delta_t  # m/s
-
-                    # Only calculate TTC if object is approaching fast enough
-                    if rel_velocity > self.MIN_VELOCITY_FOR_TTC_MPS:
-                        ttc = obj['dist'] / rel_velocity
-                        obj['ttc_obj'] = ttc
-
-            # Update tracking state
-            tracked_objects[track_id] = {
-                'dist': obj['dist'],
-                'time': current_time,
-                'class': obj['class']
-            }
+        if not current_objects:
+            return
+
+        # Velocity and TTC of all the objects in one vectorized update
+        with self._tracks_lock:
+            ttc = tracked_objects.update(
+                [obj['id'] for obj in current_objects],
+                [obj['class'] for obj in current_objects],
+                [obj['dist'] for obj in current_objects],
+                current_time,
+                self.MIN_VELOCITY_FOR_TTC_MPS
+            )
+
+        for obj, obj_ttc in zip(current_objects, ttc):
+            if obj_ttc != float('inf'):
+                obj['ttc_obj'] = float(obj_ttc)
 
     def cleanup_stale_tracks(self, current_time, tracked_objects):
-        stale_ids = [
-            track_id for track_id, state in tracked_objects.items()
-            if current_time - state['time'] > self.STALE_TRACK_THRESHOLD_SEC
-        ]
-
-        for track_id in stale_ids:
-            del tracked_objects[track_id]
+        with self._tracks_lock:
+            tracked_objects.expire(current_time, self.STALE_TRACK_THRESHOLD_SEC)
+
+    def advance_clock(self, sim_time):
+        """
+        Expires the stale tracks of all zones on the shared simulation clock,
+        also for zones that stopped producing frames.
+        """
+        tables = {id(t): t for t in self.tracked_objects.values()}
+        for tracked_objects in tables.values():
+            self.cleanup_stale_tracks(sim_time, tracked_objects)
+        if self.ego_tracker is not None:
+            self.ego_tracker.expire(sim_time)
@@ -0,0 +1,92 @@
+"""
+INT8 post-training quantization of the exported ONNX detector, calibrated on
+frames recorded from the zone cameras (see RECORD_FRAMES_DIR).
+"""
+import os
+import glob
+import random
+import cv2
+import config
+from rcta_system.detector_backends import letterbox_images
+
+ZONE_FOLDERS = tuple(config.RCTA_ZONES)
+# Il Detect head di YOLOv8 (DFL + concat delle uscite) perde molta precisione in INT8
+DETECT_HEAD_PREFIX = "/model.22/"
+
+
+def list_calibration_frames(frames_dir, max_frames=None, seed=0):
+    """Frames of all zones, shuffled so a limited set still covers every camera"""
+    paths = []
+    for zone in ZONE_FOLDERS:
+        for ext in ("*.png", "*.jpg"):
+            paths.extend(glob.glob(os.path.join(frames_dir, zone, ext)))
+
+    random.Random(seed).shuffle(paths)
+    if max_frames:
+        paths = paths[:max_frames]
+    return paths
+
+
+def _make_reader(input_name, paths, imgsz):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class RecordedFramesReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    continue
+                blob, _, _ = letterbox_images([image], imgsz)
+                return {input_name: blob}
+            return None
+
+    return RecordedFramesReader()
+
+
+def quantize_detector(fp32_model_path=config.DETECTOR_MODEL_PATHS['onnxruntime'],
+                      int8_model_path=config.DETECTOR_MODEL_PATHS['onnxruntime-int8'],
+                      frames_dir=config.QUANTIZATION_FRAMES_DIR,
+                      max_frames=config.QUANTIZATION_MAX_FRAMES,
+                      imgsz=config.DETECTOR_IMGSZ,
+                      exclude_detect_head=True):
+    """
+    Static INT8 quantization (QDQ, per-channel weights) of the ONNX detector.
+    Returns the path of the quantized model.
+    """
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import (quantize_static, QuantFormat,
+                                          QuantType, CalibrationMethod)
+
+    paths = list_calibration_frames(frames_dir, max_frames)
+    if not paths:
+        raise FileNotFoundError(f"No calibration frames in {frames_dir}/{{{','.join(ZONE_FOLDERS)}}}")
+    print(f"QUANTIZATION [Calibrating on {len(paths)} frames from {frames_dir}]")
+
+    session = ort.InferenceSession(fp32_model_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    del session
+
+    nodes_to_exclude = []
+    if exclude_detect_head:
+        graph = onnx.load(fp32_model_path).graph
+        nodes_to_exclude = [node.name for node in graph.node if node.name.startswith(DETECT_HEAD_PREFIX)]
+
+    quantize_static(
+        fp32_model_path,
+        int8_model_path,
+        _make_reader(input_name, paths, imgsz),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=nodes_to_exclude
+    )
+
+    print(f"QUANTIZATION [INT8 model saved to {int8_model_path}, "
+          f"{len(nodes_to_exclude)} head nodes kept in FP32]")
+    return int8_model_path
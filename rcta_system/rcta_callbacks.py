@@ -1,16 +1,19 @@
 import numpy as np
 import time
+import os
+import config
 from rcta_system.perception import Perception
-from rcta_system.decision_making import DecisionMaker
+from rcta_system.decision_making import DecisionMaker, CpaThreatEvaluator
+from rcta_system.zone_executor import ZoneExecutor
+from rcta_system.frame_synchronizer import FrameSynchronizer
 from hmi.mqtt_publisher import MQTTPublisher
 
 # Initialize perception system (one instance for all zones)
 perception = Perception()
 
-# Initialize decision makers (one per zone)
-decision_maker_rear = DecisionMaker("rear")
-decision_maker_left = DecisionMaker("left")
-decision_maker_right = DecisionMaker("right")
+# Initialize decision makers (one per zone): CPA on the ego path or TTC/distance thresholds
+_decision_maker_class = CpaThreatEvaluator if config.CPA_EVALUATOR_ENABLED else DecisionMaker
+decision_makers = {zone: _decision_maker_class(zone) for zone in config.RCTA_ZONES}
 
 # Initialize MQTT publisher
 mqtt_publisher = MQTTPublisher()
@@ -19,27 +22,30 @@ print("RCTA_CALLBACKS [Initialized: Perception, DecisionMakers, MQTT Publisher]"
 
 # System state
 rcta_system_active = False
+ego_speed = 0.0  # m/s, negativa in retromarcia
+# (ego_speed, steer) letto dai worker delle zone: sostituito in blocco, mai modificato
+ego_motion = (0.0, 0.0)
 
+# Ultimo allarme di ogni zona: zone -> (alert_level, timestamp)
+_last_alerts = {}
+_ALERT_RANK = {"warning": 1, "danger": 2}
 
-def rear_zone_callback(rgb_image, depth_image):
+
+def zone_callback(zone, rgb_image, depth_image, buffers):
+    """Generic pipeline of one zone, the same for every camera of the registry"""
     if not rcta_system_active:
         return
 
-    rgb_np = perception.to_numpy_rgb(rgb_image)
-    depth_meters = perception.to_depth_meters(depth_image)
+    tracked_objects = perception.tracked_objects[zone]
+    depth_raw = perception.to_depth_raw(depth_image)
     timestamp = depth_image.timestamp
-    detections = perception.detector_rear.detect(rgb_np)
-    """
-    detections = [
-    {
-        'id': 3,
-        'class': 'bicycle',
-        'confidence': 0.82,
-        'bbox': [120, 200, 280, 450]
-    }
-    ]
-    """
-    fused_objects = perception.fuse_results(detections, depth_meters)
+    fused_objects = perception.perceive(
+        zone, rgb_image, depth_raw, timestamp, buffers, tracked_objects
+    )
+    if fused_objects is None:
+        # Zona vuota secondo la depth o frame superato: niente da valutare
+        mqtt_publisher.report_zone(zone, [], timestamp)
+        return
     """
     fused_objects = [
     {
@@ -52,11 +58,7 @@ def rear_zone_callback(rgb_image, depth_image):
     }
     ]
     """
-    if timestamp - perception.last_cleanup_time_rear > perception.STALE_TRACK_THRESHOLD_SEC:
-        perception.cleanup_stale_tracks(timestamp, perception.tracked_objects_rear)
-        perception.last_cleanup_time_rear = timestamp
-
-    perception.update_tracks_and_calc_ttc(fused_objects, timestamp, perception.tracked_objects_rear)
+    perception.update_tracks_and_calc_ttc(fused_objects, timestamp, tracked_objects)
     """
     fused_objects = [
     {
@@ -69,7 +71,7 @@ def rear_zone_callback(rgb_image, depth_image):
     }
     ]
     """
-    dangerous_objects = decision_maker_rear.evaluate(fused_objects)
+    dangerous_objects = decision_makers[zone].evaluate(fused_objects, ego_motion)
     """
     dangerous_objects = [
     {
@@ -82,129 +84,82 @@ def rear_zone_callback(rgb_image, depth_image):
     ]
     """
     if dangerous_objects:
-        mqtt_publisher.publish_alerts(dangerous_objects)
-        #print(f"REAR_CALLBACK [ALERT] {dangerous_objects}")
-
-
-def left_zone_callback(rgb_image, depth_image):
-    if not rcta_system_active:
-        return
-
-    rgb_np = perception.to_numpy_rgb(rgb_image)
-    depth_meters = perception.to_depth_meters(depth_image)
-    timestamp = depth_image.timestamp
-
-    detections = perception.detector_left.detect(rgb_np)
-
-    fused_objects = perception.fuse_results(detections, depth_meters)
-
-    if timestamp - perception.last_cleanup_time_left > perception.STALE_TRACK_THRESHOLD_SEC:
-        perception.cleanup_stale_tracks(timestamp, perception.tracked_objects_left)
-        perception.last_cleanup_time_left = timestamp
-
-    perception.update_tracks_and_calc_ttc(fused_objects, timestamp, perception.tracked_objects_left)
-    dangerous_objects = decision_maker_left.evaluate(fused_objects)
-
-    if dangerous_objects:
-        mqtt_publisher.publish_alerts(dangerous_objects)
-        #print(f"LEFT_CALLBACK [ALERT] {dangerous_objects}")
-
+        _last_alerts[zone] = (max((obj['alert_level'] for obj in dangerous_objects), key=_ALERT_RANK.get), timestamp)
+    # Anche una lista vuota: la zona e' tornata libera
+    mqtt_publisher.report_zone(zone, dangerous_objects, timestamp)
+        #print(f"{zone.upper()}_CALLBACK [ALERT] {dangerous_objects}")
 
-def right_zone_callback(rgb_image, depth_image):
-    if not rcta_system_active:
-        return
-
-    rgb_np = perception.to_numpy_rgb(rgb_image)
-    depth_meters = perception.to_depth_meters(depth_image)
-    timestamp = depth_image.timestamp
 
-    detections = perception.detector_right.detect(rgb_np)
+def _run_zone_pipeline(zone, frame_pair):
+    rgb_image, depth_image = frame_pair
+    if config.RECORD_FRAMES_DIR and rgb_image.frame % config.RECORD_EVERY_N_FRAMES == 0:
+        # Frame per la calibrazione INT8 (rcta_system/quantization.py), scritto dal worker
+        # e non dal thread del sensore
+        rgb_image.save_to_disk(os.path.join(config.RECORD_FRAMES_DIR, zone, f"{rgb_image.frame:08d}.png"))
+    buffers = perception.buffer_pool.acquire(zone)
+    try:
+        zone_callback(zone, rgb_image, depth_image, buffers)
+    finally:
+        # The pipeline is done with the frame, the buffers can be reused
+        perception.buffer_pool.release(zone, buffers)
 
-    fused_objects = perception.fuse_results(detections, depth_meters)
 
-    if timestamp - perception.last_cleanup_time_right > perception.STALE_TRACK_THRESHOLD_SEC:
-        perception.cleanup_stale_tracks(timestamp, perception.tracked_objects_right)
-        perception.last_cleanup_time_right = timestamp
+# Worker threads: the CARLA sensor callbacks only enqueue the synced pairs
+zone_executor = ZoneExecutor(config.RCTA_ZONES, _run_zone_pipeline)
+zone_executor.start()
 
-    perception.update_tracks_and_calc_ttc(fused_objects, timestamp, perception.tracked_objects_right)
-    dangerous_objects = decision_maker_right.evaluate(fused_objects)
 
-    # MQTT Notification
-    if dangerous_objects:
-        mqtt_publisher.publish_alerts(dangerous_objects)
-        #print(f"RIGHT_CALLBACK [ALERT] {dangerous_objects}")
+def advance_clock(sim_time):
+    """Called once per world tick: track expiry and alert publishing run on the simulation clock"""
+    perception.advance_clock(sim_time)
+    mqtt_publisher.flush(sim_time)
 
 
 def update_vehicle_state(vehicle):
-    global rcta_system_active
+    global rcta_system_active, ego_speed, ego_motion
     control = vehicle.get_control()
     rcta_system_active = control.reverse
 
+    # Velocita' longitudinale con segno (negativa in retromarcia)
+    velocity = vehicle.get_velocity()
+    forward = vehicle.get_transform().get_forward_vector()
+    ego_speed = velocity.x * forward.x + velocity.y * forward.y + velocity.z * forward.z
+    ego_motion = (ego_speed, control.steer)
+
+
+def get_ego_state():
+    """(reverse gear engaged, signed longitudinal speed m/s)"""
+    return rcta_system_active, ego_speed
+
 
-# Temporary storage for synchronizing RGB + Depth
-rear_rgb_data = None
-rear_depth_data = None
+def highest_alert_level(sim_time):
+    """Highest alert level raised by any zone in the last ALERT_LEVEL_TTL_SEC, or None"""
+    levels = [level for level, t in list(_last_alerts.values()) if sim_time - t <= config.ALERT_LEVEL_TTL_SEC]
+    return max(levels, key=_ALERT_RANK.get) if levels else None
 
-left_rgb_data = None
-left_depth_data = None
 
-right_rgb_data = None
-right_depth_data = None
+# RGB + Depth pairing by frame number
+frame_synchronizer = FrameSynchronizer(config.RCTA_ZONES)
 
 
 def sync_and_callback(zone, sensor_type, image):
-    global rear_rgb_data, rear_depth_data
-    global left_rgb_data, left_depth_data
-    global right_rgb_data, right_depth_data
-
-    if zone == "rear":
-        if sensor_type == "rgb":
-            rear_rgb_data = image
-            # If depth is already available, call callback
-            if rear_depth_data is not None:
-                rear_zone_callback(rear_rgb_data, rear_depth_data)
-                # Reset after processing
-                rear_rgb_data = None
-                rear_depth_data = None
-
-        elif sensor_type == "depth":
-            rear_depth_data = image
-            # If RGB is already available, call callback
-            if rear_rgb_data is not None:
-                rear_zone_callback(rear_rgb_data, rear_depth_data)
-                # Reset after processing
-                rear_rgb_data = None
-                rear_depth_data = None
-
-    elif zone == "left":
-        if sensor_type == "rgb":
-            left_rgb_data = image
-            if left_depth_data is not None:
-                left_zone_callback(left_rgb_data, left_depth_data)
-                left_rgb_data = None
-                left_depth_data = None
-
-        elif sensor_type == "depth":
-            left_depth_data = image
-            if left_rgb_data is not None:
-                left_zone_callback(left_rgb_data, left_depth_data)
-                left_rgb_data = None
-                left_depth_data = None
-
-    elif zone == "right":
-        if sensor_type == "rgb":
-            right_rgb_data = image
-            if right_depth_data is not None:
-                right_zone_callback(right_rgb_data, right_depth_data)
-                right_rgb_data = None
-                right_depth_data = None
-
-        elif sensor_type == "depth":
-            right_depth_data = image
-            if right_rgb_data is not None:
-                right_zone_callback(right_rgb_data, right_depth_data)
-                right_rgb_data = None
-                right_depth_data = None
-
-    else:
-        print(f"SYNC_ERROR [Unknown zone: {zone}]")
+    frame_pair = frame_synchronizer.push(zone, sensor_type, image)
+    if frame_pair is not None:
+        # Both images of the same frame are available, enqueue the pair for the workers
+        zone_executor.submit(zone, frame_pair)
+
+
+def shutdown():
+    zone_executor.stop()
+    print(f"RCTA_CALLBACKS [Sync stats: {frame_synchronizer.get_stats()}]")
+    print(f"RCTA_CALLBACKS [Executor stats: {zone_executor.get_stats()}]")
+    print(f"RCTA_CALLBACKS [Buffer pool stats: {perception.buffer_pool.get_stats()}]")
+    if perception.occupancy_gate is not None:
+        print(f"RCTA_CALLBACKS [Occupancy gate stats: {perception.occupancy_gate.get_stats()}]")
+    if perception.box_propagator is not None:
+        print(f"RCTA_CALLBACKS [Propagation stats: {perception.box_propagator.get_stats()}]")
+    if perception.ego_tracker is not None:
+        print(f"RCTA_CALLBACKS [Ego tracker stats: {perception.ego_tracker.get_stats()}]")
+    print(f"RCTA_CALLBACKS [Inference stats: {perception.inference_engine.get_stats()}]")
+    print(f"RCTA_CALLBACKS [MQTT stats: {mqtt_publisher.get_stats()}]")
+    mqtt_publisher.disconnect()
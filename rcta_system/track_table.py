@@ -0,0 +1,171 @@
+import heapq
+import numpy as np
+import config
+
+
+class TrackTable:
+    """
+    Track store of one zone as NumPy columns (struct of arrays).
+    track_id -> slot index, freed slots are reused through a free-list.
+    Every track keeps a ring buffer of its last (time, dist) samples: velocity
+    and TTC come from a least-squares fit over the window, computed for all
+    the tracks of a frame at once.
+    Expiry uses a min-heap keyed by last-seen time with one entry per live
+    track: entries are re-keyed lazily when popped, so an expiry pass costs
+    O(expired + rescheduled) and the heap never outgrows the live tracks.
+    """
+
+    def __init__(self, capacity=config.TRACK_TABLE_CAPACITY, history_length=config.TTC_HISTORY_LENGTH):
+        self.capacity = capacity
+        self.history_length = history_length
+        self.track_ids = np.full(capacity, -1, dtype=np.int64)
+        self.dist = np.full(capacity, np.inf, dtype=np.float64)
+        self.time = np.zeros(capacity, dtype=np.float64)
+        self.class_idx = np.zeros(capacity, dtype=np.int16)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        # Ring buffer (time, dist) per track
+        self.hist_time = np.zeros((capacity, history_length), dtype=np.float64)
+        self.hist_dist = np.zeros((capacity, history_length), dtype=np.float64)
+        self.hist_head = np.zeros(capacity, dtype=np.int64)
+        self.hist_count = np.zeros(capacity, dtype=np.int64)
+
+        self._index = {}  # track_id -> slot
+        self._free = list(range(capacity - 1, -1, -1))  # stack, slot 0 in cima
+        self._class_names = []
+        self._class_lookup = {}
+        self._expiry_heap = []  # (last_seen, track_id, slot)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, track_id):
+        return track_id in self._index
+
+    def _grow(self):
+        old = self.capacity
+        self.capacity = old * 2
+        self.track_ids = np.concatenate([self.track_ids, np.full(old, -1, dtype=np.int64)])
+        self.dist = np.concatenate([self.dist, np.full(old, np.inf)])
+        self.time = np.concatenate([self.time, np.zeros(old)])
+        self.class_idx = np.concatenate([self.class_idx, np.zeros(old, dtype=np.int16)])
+        self.active = np.concatenate([self.active, np.zeros(old, dtype=bool)])
+        self.hist_time = np.concatenate([self.hist_time, np.zeros((old, self.history_length))])
+        self.hist_dist = np.concatenate([self.hist_dist, np.zeros((old, self.history_length))])
+        self.hist_head = np.concatenate([self.hist_head, np.zeros(old, dtype=np.int64)])
+        self.hist_count = np.concatenate([self.hist_count, np.zeros(old, dtype=np.int64)])
+        self._free.extend(range(self.capacity - 1, old - 1, -1))
+
+    def _class_index(self, class_name):
+        idx = self._class_lookup.get(class_name)
+        if idx is None:
+            idx = len(self._class_names)
+            self._class_names.append(class_name)
+            self._class_lookup[class_name] = idx
+        return idx
+
+    def class_name(self, slot):
+        return self._class_names[self.class_idx[slot]]
+
+    def slots_for(self, track_ids):
+        """Slot of every id, allocating new slots for unknown ids. Returns (slots, is_new)"""
+        slots = np.empty(len(track_ids), dtype=np.int64)
+        is_new = np.zeros(len(track_ids), dtype=bool)
+        for i, track_id in enumerate(track_ids):
+            slot = self._index.get(track_id)
+            if slot is None:
+                if not self._free:
+                    self._grow()
+                slot = self._free.pop()
+                self._index[track_id] = slot
+                self.track_ids[slot] = track_id
+                self.active[slot] = True
+                self.hist_head[slot] = 0
+                self.hist_count[slot] = 0
+                is_new[i] = True
+            slots[i] = slot
+        return slots, is_new
+
+    def update(self, track_ids, class_names, dists, current_time, min_velocity):
+        """
+        Stores the new distances and returns the TTC of each object
+        (inf when the track has less than two samples, is not approaching or is too slow).
+        """
+        dists = np.asarray(dists, dtype=np.float64)
+        slots, is_new = self.slots_for(track_ids)
+
+        # Nuovo campione nel ring buffer di ogni track
+        head = self.hist_head[slots]
+        self.hist_time[slots, head] = current_time
+        self.hist_dist[slots, head] = dists
+        self.hist_head[slots] = (head + 1) % self.history_length
+        self.hist_count[slots] = np.minimum(self.hist_count[slots] + 1, self.history_length)
+
+        self.dist[slots] = dists
+        self.time[slots] = current_time
+        self.class_idx[slots] = [self._class_index(c) for c in class_names]
+        for slot in slots[is_new].tolist():
+            heapq.heappush(self._expiry_heap, (current_time, int(self.track_ids[slot]), slot))
+
+        rel_velocity, fitted_dist = self._fit_window(slots, current_time)
+
+        ttc = np.full(len(slots), np.inf)
+        # Only calculate TTC if object is approaching fast enough
+        approaching = rel_velocity > min_velocity
+        ttc[approaching] = fitted_dist[approaching] / rel_velocity[approaching]
+        return ttc
+
+    def _fit_window(self, slots, current_time):
+        """
+        Least-squares line dist = a + b * (t - current_time) on the window of
+        each slot. Returns the approaching velocity (-b, m/s) and the fitted
+        current distance (a). Slots without a valid fit get velocity 0.
+        """
+        t = self.hist_time[slots] - current_time
+        d = self.hist_dist[slots]
+        positions = np.arange(self.history_length)
+        valid = (positions[None, :] < self.hist_count[slots][:, None]) & np.isfinite(d)
+
+        w = valid.astype(np.float64)
+        t = np.where(valid, t, 0.0)
+        d = np.where(valid, d, 0.0)
+        n = w.sum(axis=1)
+        sum_t = t.sum(axis=1)
+        sum_d = d.sum(axis=1)
+        sum_tt = (t * t).sum(axis=1)
+        sum_td = (t * d).sum(axis=1)
+
+        denom = n * sum_tt - sum_t * sum_t
+        ok = (n >= 2) & (denom > 1e-9)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(ok, (n * sum_td - sum_t * sum_d) / denom, 0.0)
+            intercept = np.where(ok, (sum_d - slope * sum_t) / n, self.dist[slots])
+
+        fitted_dist = np.maximum(intercept, 0.0)
+        return -slope, fitted_dist
+
+    def expire(self, current_time, max_age):
+        """Removes the tracks not seen for more than max_age seconds, returns how many"""
+        cutoff = current_time - max_age
+        heap = self._expiry_heap
+        stale_slots = []
+
+        while heap and heap[0][0] < cutoff:
+            _, track_id, slot = heapq.heappop(heap)
+            last_seen = self.time[slot]
+            if last_seen >= cutoff:
+                # Visto di nuovo dopo l'inserimento: nuova scadenza
+                heapq.heappush(heap, (last_seen, track_id, slot))
+                continue
+            stale_slots.append(slot)
+            del self._index[track_id]
+
+        if not stale_slots:
+            return 0
+
+        stale_slots = np.array(stale_slots, dtype=np.int64)
+        self.active[stale_slots] = False
+        self.track_ids[stale_slots] = -1
+        self.dist[stale_slots] = np.inf
+        self._free.extend(stale_slots.tolist())
+        return int(stale_slots.size)
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+import config
+
+
+class ZoneExecutor:
+    """
+    Runs the zone pipelines on worker threads, off the CARLA sensor threads.
+    Each zone has a bounded queue: when it is full the oldest frame is dropped,
+    so the pipeline always works on the freshest data.
+    A zone is never processed by two workers at the same time (tracking state
+    must see its frames in order).
+    """
+
+    def __init__(self, zones, handler,
+                 queue_size=config.ZONE_QUEUE_SIZE,
+                 num_workers=config.ZONE_WORKERS):
+        # handler(zone, item) runs the pipeline for one queued item
+        self.zones = list(zones)
+        self.handler = handler
+        self.queue_size = queue_size
+        self.num_workers = num_workers
+
+        self._cond = threading.Condition()
+        self._queues = {zone: deque() for zone in self.zones}
+        self._busy_zones = set()
+        self._workers = []
+        self._running = False
+
+        # Statistics per zone
+        self._stats = {
+            zone: {
+                'enqueued': 0,
+                'dequeued': 0,
+                'processed': 0,
+                'dropped': 0,
+                'max_depth': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0
+            } for zone in self.zones
+        }
+
+        print(f"ZONE_EXECUTOR [Initialized: {num_workers} workers, queue size {queue_size}]")
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+
+        for i in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"rcta-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, zone, item):
+        """Called from the sensor threads: only enqueues, never blocks on the pipeline"""
+        with self._cond:
+            queue = self._queues[zone]
+            stats = self._stats[zone]
+
+            if len(queue) >= self.queue_size:
+                queue.popleft()
+                stats['dropped'] += 1
+
+            queue.append((time.perf_counter(), item))
+            stats['enqueued'] += 1
+            stats['max_depth'] = max(stats['max_depth'], len(queue))
+            self._cond.notify_all()
+
+    def _next_zone(self):
+        # Zone libera con il frame in coda da piu' tempo
+        best_zone = None
+        best_time = None
+        for zone, queue in self._queues.items():
+            if not queue or zone in self._busy_zones:
+                continue
+            if best_time is None or queue[0][0] < best_time:
+                best_zone = zone
+                best_time = queue[0][0]
+        return best_zone
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                zone = self._next_zone()
+                while self._running and zone is None:
+                    self._cond.wait()
+                    zone = self._next_zone()
+
+                if not self._running:
+                    return
+
+                enqueue_time, item = self._queues[zone].popleft()
+                self._busy_zones.add(zone)
+
+                wait = time.perf_counter() - enqueue_time
+                stats = self._stats[zone]
+                stats['dequeued'] += 1
+                stats['total_wait'] += wait
+                stats['max_wait'] = max(stats['max_wait'], wait)
+
+            try:
+                self.handler(zone, item)
+            except Exception as e:
+                print(f"ZONE_EXECUTOR [ERROR in {zone} pipeline: {e}]")
+            finally:
+                with self._cond:
+                    self._busy_zones.discard(zone)
+                    self._stats[zone]['processed'] += 1
+                    self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            report = {}
+            for zone, stats in self._stats.items():
+                dequeued = stats['dequeued']
+                report[zone] = {
+                    'queue_depth': len(self._queues[zone]),
+                    'max_queue_depth': stats['max_depth'],
+                    'enqueued': stats['enqueued'],
+                    'processed': stats['processed'],
+                    'dropped': stats['dropped'],
+                    'avg_wait_sec': stats['total_wait'] / dequeued if dequeued else 0.0,
+                    'max_wait_sec': stats['max_wait']
+                }
+            return report
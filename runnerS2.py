@@ -7,7 +7,7 @@ from carla_bridge.carla_manager import CarlaManager
 from carla_bridge.spawner import Spawner
 from carla_bridge.sensor_manager import SensorManager
 from controller.keyboard_controller import KeyboardController
-from rcta_system.rcta_callbacks import sync_and_callback, update_vehicle_state
+from rcta_system.rcta_callbacks import sync_and_callback, update_vehicle_state, advance_clock
 from scenarios.parking_lot_scenario import (setup_rcta_base_scenario,
                                             scenario_bicycle,
                                             scenario_pedestrian_adult,
@@ -41,23 +41,15 @@ def main():
 
             print("MAIN [Initializing Sensor manager and cameras]")
             sensor_manager = SensorManager(manager.world, manager.actor_list)
-            (r_rgb, r_depth, l_rgb, l_depth, ri_rgb, ri_depth) = sensor_manager.setup_rcta_cameras(ego_vehicle)
+            zone_cameras = sensor_manager.setup_rcta_cameras(ego_vehicle)
 
             print("MAIN [Registering RCTA callbacks]")
-            # REAR zone callbacks
-            r_rgb.listen(lambda image: sync_and_callback("rear", "rgb", image))
-            r_depth.listen(lambda image: sync_and_callback("rear", "depth", image))
-            #print("MAIN [REAR callbacks registered]")
-
-            # LEFT zone callbacks
-            l_rgb.listen(lambda image: sync_and_callback("left", "rgb", image))
-            l_depth.listen(lambda image: sync_and_callback("left", "depth", image))
-            #print("MAIN [LEFT callbacks registered]")
-
-            # RIGHT zone callbacks
-            ri_rgb.listen(lambda image: sync_and_callback("right", "rgb", image))
-            ri_depth.listen(lambda image: sync_and_callback("right", "depth", image))
-            #print("MAIN [RIGHT callbacks registered]")
+            for zone, (rgb_cam, depth_cam) in zone_cameras.items():
+                if rgb_cam is None or depth_cam is None:
+                    continue
+                rgb_cam.listen(lambda image, zone=zone: sync_and_callback(zone, "rgb", image))
+                depth_cam.listen(lambda image, zone=zone: sync_and_callback(zone, "depth", image))
+                #print(f"MAIN [{zone.upper()} callbacks registered]")
 
             #Differents SCENARIOs
             #scenario_vehicle(spawner)
@@ -75,7 +67,8 @@ def main():
                     if event.type == pygame.QUIT:
                         running = False
 
-                manager.world.wait_for_tick()
+                snapshot = manager.world.wait_for_tick()
+                advance_clock(snapshot.timestamp.elapsed_seconds)
 
 
                 # Get keyboard input and apply control